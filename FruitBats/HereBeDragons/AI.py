@@ -0,0 +1,235 @@
+import math
+import multiprocessing
+
+import numpy
+
+from Map import MAP
+
+LINE_STEP = 0.25  # distance in tiles between the checks of line_clear()
+DECISION_SIZE = 6  # numbers in a decision (see chase_decision)
+
+
+def line_clear(blocked, (x0, y0), (x1, y1)):
+    """Returns True if the straight line from x0, y0 to x1, y1 (in tiles,
+       not rounded) crosses no tile set in blocked, a grid indexed [x][y].
+       Tiles off the grid count as blocked."""
+    size_x, size_y = blocked.shape
+    length = math.sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2)
+    steps = int(length / LINE_STEP) + 1
+    for step in xrange(steps + 1):
+        along = float(step) / steps
+        x = int(math.floor(x0 + (x1 - x0) * along))
+        y = int(math.floor(y0 + (y1 - y0) * along))
+        if x < 0 or y < 0 or x >= size_x or y >= size_y or blocked[x, y]:
+            return False
+    return True
+
+
+def chase_decision(x, y, player_x, player_y, detection_range, acceleration,
+                   blocked=None):
+    """Decides what a chasing enemy at x, y does about the player.
+       Returns (chasing, acceleration x, acceleration y, path needed,
+       target x, target y), acceleration in tiles/sec/sec. The target is
+       where to chase; a path is needed when the straight line there
+       crosses a tile set in blocked (never, without a grid). Only plain
+       numbers go in and out, so this runs the same inline or in an
+       AIScheduler worker."""
+    to_x = player_x - x
+    to_y = player_y - y
+    player_distance = math.sqrt(to_x * to_x + to_y * to_y)
+    if player_distance > detection_range:
+        return False, 0.0, 0.0, False, x, y
+    if player_distance == 0:
+        return True, 0.0, 0.0, False, player_x, player_y
+
+    # Accelerate harder the closer the player is
+    strength = acceleration * (1 - player_distance / detection_range)
+    path_needed = blocked is not None and \
+        not line_clear(blocked, (x, y), (player_x, player_y))
+    return (True, to_x * strength / player_distance,
+            to_y * strength / player_distance, path_needed,
+            player_x, player_y)
+
+
+# Shared arrays of the current worker process (see AIScheduler)
+worker_positions = None
+worker_decisions = None
+worker_blocked = None
+
+
+def init_worker(positions, decisions, blocked, size_x, size_y):
+    """Pool initialiser: keeps the scheduler's shared arrays"""
+    global worker_positions, worker_decisions, worker_blocked
+    worker_positions = numpy.frombuffer(positions, dtype=numpy.float64)
+    worker_decisions = numpy.frombuffer(decisions, dtype=numpy.float64)
+    worker_blocked = numpy.frombuffer(blocked, dtype=numpy.int8).reshape(
+        size_x, size_y)
+
+
+def think(indices, positions, decisions, blocked, player_x, player_y,
+          detection_range, acceleration):
+    """Decides for the enemies at indices, reading their positions from
+       and writing their decisions to the given arrays"""
+    for index in indices:
+        first = index * DECISION_SIZE
+        decisions[first:first + DECISION_SIZE] = chase_decision(
+            positions[index * 2], positions[index * 2 + 1],
+            player_x, player_y, detection_range, acceleration, blocked)
+
+
+def think_region((indices, player_x, player_y, detection_range, acceleration)):
+    """Pool task: decides for the enemies of one region. Reads positions
+       from and writes decisions to the shared arrays, so only the
+       indices travel between processes."""
+    think(indices, worker_positions, worker_decisions, worker_blocked,
+          player_x, player_y, detection_range, acceleration)
+
+
+class AIScheduler:
+    """Runs enemy decision making, on a pool of worker processes or on
+    the main thread.
+
+    Each tick the enemy positions are written to a shared-memory array,
+    the enemies are split into regions of REGION_SIZE tiles and each
+    region becomes one pool task. Workers run while the main thread
+    renders; the decisions are collected and handed to the enemies at
+    the start of the next tick, before anything moves. With no workers
+    the tasks run at dispatch instead, and the decisions are still only
+    handed out at the next collect, so every enemy acts on the positions
+    from the end of the previous tick whatever the number of workers.
+
+    The tiles the pathfinder can't walk over are kept in a shared grid
+    too, so workers can tell when the way to the player is blocked. For
+    those enemies collect asks the pathfinder for a path to the target.
+
+    Enemies need x, y, detection_range, acceleration, a decision
+    attribute, and path_goal, set_path_request() and path_found() (see
+    ChaserEnemy); an enemy with decision None decides for itself.
+    """
+    REGION_SIZE = MAP.CHUNK_SIZE * 4  # tiles per side of a region
+    MIN_CAPACITY = 64  # smallest number of enemies the arrays hold
+
+    workers = 0  # number of worker processes (0 = decide at dispatch)
+    pool = None  # worker Pool, if there are workers
+    pathfinder = None  # Pathfinder paths are requested from
+    capacity = 0  # number of enemies the shared arrays can hold
+    positions = None  # shared x, y of each enemy
+    decisions = None  # shared chase_decision results of each enemy
+    raw_blocked = None  # shared memory of blocked, with workers
+    blocked = None  # shared grid of unwalkable tiles, indexed [x][y]
+    pending = None  # AsyncResult of the dispatched tasks
+    enemies = None  # enemies the pending tasks are deciding for
+
+    def __init__(self, pathfinder, workers=None):
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = max(0, workers)
+        self.pathfinder = pathfinder
+
+        # Keep a copy of the unwalkable tiles where workers can see it
+        size = (pathfinder.size_x, pathfinder.size_y)
+        if self.workers == 0:
+            self.blocked = numpy.zeros(size, numpy.int8)
+        else:
+            self.raw_blocked = multiprocessing.RawArray("b", size[0] * size[1])
+            self.blocked = numpy.frombuffer(
+                self.raw_blocked, dtype=numpy.int8).reshape(size)
+        self.blocked[:] = pathfinder.blocked_grid()
+        pathfinder.listeners.append(self.tile_changed)
+
+    def tile_changed(self, x, y):
+        """Pathfinder listener: updates the shared grid for one tile"""
+        self.blocked[x, y] = not self.pathfinder.walkable(x, y)
+
+    def ensure_capacity(self, count):
+        """(Re)creates the shared arrays and pool if count enemies won't
+           fit. Workers are given the arrays when they start, so the pool
+           is restarted along with them."""
+        if count <= self.capacity:
+            return
+        self.close()
+        self.capacity = max(self.MIN_CAPACITY, self.capacity * 2, count)
+        if self.workers == 0:
+            self.positions = numpy.zeros(self.capacity * 2)
+            self.decisions = numpy.zeros(self.capacity * DECISION_SIZE)
+            return
+        raw_positions = multiprocessing.RawArray("d", self.capacity * 2)
+        raw_decisions = multiprocessing.RawArray(
+            "d", self.capacity * DECISION_SIZE)
+        self.positions = numpy.frombuffer(raw_positions, dtype=numpy.float64)
+        self.decisions = numpy.frombuffer(raw_decisions, dtype=numpy.float64)
+        self.pool = multiprocessing.Pool(
+            self.workers, init_worker,
+            (raw_positions, raw_decisions, self.raw_blocked) +
+            self.blocked.shape)
+
+    def partition(self, enemies):
+        """Returns lists of enemy indices, one per region, in a fixed
+           order"""
+        regions = dict()
+        for index, enemy in enumerate(enemies):
+            key = (int(enemy.x) // self.REGION_SIZE,
+                   int(enemy.y) // self.REGION_SIZE)
+            regions.setdefault(key, []).append(index)
+        return [regions[key] for key in sorted(regions)]
+
+    def dispatch(self, enemies, player):
+        """Starts deciding for enemies from their current positions"""
+        self.collect()
+        if not enemies:
+            return
+        self.ensure_capacity(len(enemies))
+        for index, enemy in enumerate(enemies):
+            self.positions[index * 2] = enemy.x
+            self.positions[index * 2 + 1] = enemy.y
+
+        tasks = []
+        for indices in self.partition(enemies):
+            # Regions are only split by position, so group by the enemy
+            # settings too (they're per class)
+            by_settings = dict()
+            for index in indices:
+                settings = (enemies[index].detection_range,
+                            enemies[index].acceleration)
+                by_settings.setdefault(settings, []).append(index)
+            for (detection_range, acceleration), group in \
+                    sorted(by_settings.items()):
+                tasks.append((group, player.x, player.y,
+                              detection_range, acceleration))
+        self.enemies = list(enemies)
+        if self.pool is None:
+            for task in tasks:
+                think(task[0], self.positions, self.decisions, self.blocked,
+                      *task[1:])
+        else:
+            self.pending = self.pool.map_async(think_region, tasks)
+
+    def collect(self):
+        """Waits for the dispatched decisions and hands them to the
+           enemies, requesting paths for those that need one. Call at the
+           start of a tick."""
+        if self.enemies is None:
+            return
+        if self.pending is not None:
+            self.pending.get()
+        for index, enemy in enumerate(self.enemies):
+            first = index * DECISION_SIZE
+            chasing, accel_x, accel_y, path_needed, target_x, target_y = \
+                self.decisions[first:first + DECISION_SIZE].tolist()
+            enemy.decision = (bool(chasing), accel_x, accel_y,
+                              bool(path_needed), target_x, target_y)
+            goal = (int(target_x), int(target_y))
+            if path_needed and goal != enemy.path_goal:
+                enemy.set_path_request(goal, self.pathfinder.request_path(
+                    (int(enemy.x), int(enemy.y)), goal, enemy.path_found))
+        self.pending = None
+        self.enemies = None
+
+    def close(self):
+        """Stops the worker processes"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.pending = None
+        self.enemies = None
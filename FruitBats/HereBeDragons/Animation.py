@@ -0,0 +1,147 @@
+import pygame
+
+from Assets import assets
+
+# Animator states
+IDLE = "idle"
+WALK = "walk"
+ATTACK = "attack"
+
+
+class AnimationClock:
+    """Game time shared by every animation. Ticking it once a frame
+    advances all animations at once; animators only remember when they
+    started, and work out their frame from the clock when drawn."""
+    time = 0.0  # seconds of game time passed
+
+    def tick(self, delta_time):
+        self.time += delta_time
+
+
+# Clock driving every Animator
+animation_clock = AnimationClock()
+
+
+class Animation:
+    """One animation: a run of frames shown frame_time seconds each"""
+    frames = None  # frame surfaces, in order
+    frame_time = 0.1  # seconds per frame
+    loop = True  # start over at the end (otherwise hold the last frame)
+
+    def __init__(self, frames, frame_time, loop):
+        self.frames = frames
+        self.frame_time = frame_time
+        self.loop = loop
+
+    def duration(self):
+        """Returns the length of one run through the frames, in seconds"""
+        return len(self.frames) * self.frame_time
+
+
+class SpriteSheet:
+    """An image cut into equally sized frames, left to right then top to
+    bottom. Frames are sliced, scaled and converted once when the sheet
+    is made and sheets are cached, so every object using an image shares
+    one set of frame surfaces."""
+    cache = dict()  # sheets by (name, frame size, scale)
+
+    frames = None  # frame surfaces, in sheet order
+    frame_size = None  # (width, height) of a frame before scaling
+    animation_sets = None  # frame table: animations made from it
+
+    @staticmethod
+    def get(filename, frame_size=None, scale=1):
+        """Returns the shared sheet for an image file, loading it the
+           first time. frame_size None makes the whole image one frame."""
+        key = (filename, frame_size, scale)
+        if key not in SpriteSheet.cache:
+            SpriteSheet.cache[key] = SpriteSheet(assets.image(filename),
+                                                 frame_size, scale)
+        return SpriteSheet.cache[key]
+
+    @staticmethod
+    def from_surface(name, surface, frame_size=None, scale=1):
+        """Makes a sheet from an existing surface and caches it under
+           name, replacing any older sheet of that name"""
+        sheet = SpriteSheet(surface, frame_size, scale)
+        SpriteSheet.cache[(name, frame_size, scale)] = sheet
+        return sheet
+
+    def __init__(self, image, frame_size=None, scale=1):
+        image = image.convert_alpha()
+        if frame_size is None:
+            frame_size = image.get_size()
+        self.frame_size = frame_size
+        self.frames = []
+        self.animation_sets = dict()
+
+        width, height = frame_size
+        for top in xrange(0, image.get_height() - height + 1, height):
+            for left in xrange(0, image.get_width() - width + 1, width):
+                frame = image.subsurface((left, top, width, height)).copy()
+                if scale != 1:
+                    frame = pygame.transform.scale(
+                        frame, (int(width * scale), int(height * scale)))
+                self.frames.append(frame)
+
+    def animations(self, table):
+        """Returns {name: Animation} for a frame table, which maps each
+           animation name to (first frame, frame count, frame time, loop).
+           The result is cached, so instances sharing a table share it."""
+        key = tuple(sorted(table.items()))
+        if key not in self.animation_sets:
+            animations = dict()
+            for name, (first, count, frame_time, loop) in table.iteritems():
+                animations[name] = Animation(self.frames[first:first + count],
+                                             frame_time, loop)
+            self.animation_sets[key] = animations
+        return self.animation_sets[key]
+
+
+class Animator:
+    """Idle/walk/attack state machine for one object. An attack plays
+    through once, then the animator goes back to idle or walking.
+    States missing from the animations fall back to IDLE."""
+    animations = None  # {state: Animation}
+    state = IDLE
+    start_time = 0.0  # animation_clock time the current state started
+
+    def __init__(self, animations):
+        self.animations = animations
+        self.start_time = animation_clock.time
+
+    def play(self, state, restart=False):
+        """Switches to state, from its first frame if it's a new state or
+           restart is set"""
+        if state not in self.animations:
+            state = IDLE
+        if state != self.state or restart:
+            self.state = state
+            self.start_time = animation_clock.time
+
+    def finished(self):
+        """Returns True if a non-looping state has played through"""
+        animation = self.animations[self.state]
+        return (not animation.loop and
+                animation_clock.time - self.start_time >= animation.duration())
+
+    def attack(self):
+        """Plays the attack animation from the start"""
+        self.play(ATTACK, True)
+
+    def update(self, moving):
+        """Walks or idles, once any attack has finished"""
+        if self.state == ATTACK and not self.finished():
+            return
+        self.play(WALK if moving else IDLE)
+
+    def frame(self):
+        """Returns the surface to draw now"""
+        animation = self.animations[self.state]
+        index = int((animation_clock.time - self.start_time)
+                    / animation.frame_time)
+        if animation.loop:
+            index %= len(animation.frames)
+        else:
+            index = min(index, len(animation.frames) - 1)
+        return animation.frames[index]
@@ -0,0 +1,128 @@
+import sys
+import time
+import Queue
+import threading
+
+import pygame
+
+
+class AssetEntry:
+    """An asset that is loading or loaded"""
+    value = None
+    error = None  # sys.exc_info() if loading failed
+
+    def __init__(self):
+        self.ready = threading.Event()
+
+
+class Assets:
+    """Loads assets once and shares them between everything that uses them.
+
+    prefetch queues an asset to be made on worker threads, so images (and
+    anything else slow to make, like the light sprites) can load while the
+    menu waits for input. Getting an asset that is still loading waits for
+    just that one; getting one that was never prefetched makes it there
+    and then. Images are decoded on the workers and converted to the
+    display's format on the main thread, since that needs the display."""
+    WORKERS = 2  # prefetch threads
+
+    entries = None  # key: AssetEntry
+    converted = None  # (filename, alpha): image in the display's format
+    jobs = None  # Queue of (entry, function, args) for the workers
+    workers = None  # worker threads, started by the first prefetch
+    lock = None  # guards entries between the main thread and prefetch
+    wait_time = 0.0  # seconds spent waiting on assets still loading
+
+    def __init__(self):
+        self.entries = dict()
+        self.converted = dict()
+        self.jobs = Queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def prefetch(self, key, function, *args):
+        """Starts making an asset on a worker thread, if it isn't already
+           made or on its way. function(*args) makes it; it mustn't touch
+           the display."""
+        with self.lock:
+            if key in self.entries:
+                return
+            entry = AssetEntry()
+            self.entries[key] = entry
+        if not self.workers:
+            for i in xrange(self.WORKERS):
+                worker = threading.Thread(target=self.run_worker)
+                worker.daemon = True
+                worker.start()
+                self.workers.append(worker)
+        self.jobs.put((entry, function, args))
+
+    def prefetch_images(self, filenames):
+        """Starts decoding image files on the worker threads"""
+        for filename in filenames:
+            self.prefetch(filename, pygame.image.load, filename)
+
+    def get(self, key, function, *args):
+        """Returns an asset, waiting for it if it's being prefetched or
+           making it with function(*args) if it was never asked for"""
+        with self.lock:
+            entry = self.entries.get(key)
+            made_here = entry is None
+            if made_here:
+                entry = AssetEntry()
+                self.entries[key] = entry
+
+        if made_here:
+            self.make(entry, function, args)
+        elif not entry.ready.is_set():
+            start = time.time()
+            entry.ready.wait()
+            self.wait_time += time.time() - start
+
+        if entry.error is not None:
+            raise entry.error[0], entry.error[1], entry.error[2]
+        return entry.value
+
+    def image(self, filename):
+        """Returns an image file as it was decoded (shared, so don't draw
+           on it)"""
+        return self.get(filename, pygame.image.load, filename)
+
+    def load_image(self, filename, alpha=False):
+        """Returns an image file converted to the display's format, with
+           per-pixel alpha if alpha is set. The image is shared, so don't
+           draw on it."""
+        key = (filename, alpha)
+        if key not in self.converted:
+            image = self.image(filename)
+            if pygame.display.get_surface() is None:
+                return image  # can't convert until there's a display
+            if alpha:
+                image = image.convert_alpha()
+            else:
+                image = image.convert()
+            self.converted[key] = image
+        return self.converted[key]
+
+    def pending(self):
+        """Returns how many prefetched assets haven't finished loading"""
+        with self.lock:
+            entries = self.entries.values()
+        return len([entry for entry in entries if not entry.ready.is_set()])
+
+    @staticmethod
+    def make(entry, function, args):
+        try:
+            entry.value = function(*args)
+        except Exception:
+            entry.error = sys.exc_info()
+        entry.ready.set()
+
+    def run_worker(self):
+        while True:
+            entry, function, args = self.jobs.get()
+            self.make(entry, function, args)
+
+
+# Assets shared by the whole game
+assets = Assets()
@@ -4,6 +4,8 @@ import math
 from Objects import Object
 from Collision import CollisionParams
 from Map import MapClass, MAP
+from Input import input_state
+from Assets import assets
 
 
 class Swipe(Object):
@@ -13,24 +15,22 @@ class Swipe(Object):
     swipe_angle = 0  # angle of a swipe animation that started upon mouse click
 
     def __init__(self, x, y):
-        self.original_sprite = pygame.image.load("graphics/sword.png")
+        self.original_sprite = assets.load_image("graphics/sword.png", True)
         self.sprite = self.original_sprite  # making a copy of an image
         self.x = x
         self.y = y
         self.collision = CollisionParams((0, 0), (32, 32), False)
 
     def update(self, delta_time, player, object_list, map):
-        # looking for mouse's x value
-        mouse_x = float(pygame.mouse.get_pos()[0]) / MAP.TILE_SIZE
-        # looking for mouse's y value
-        mouse_y = float(pygame.mouse.get_pos()[1]) / MAP.TILE_SIZE
+        # looking for mouse's position in the world
+        mouse_x, mouse_y = input_state.mouse_world
         # sets and object (sword) to point at mouse position
         angle_to_mouse = float(math.atan2((self.y - mouse_y),
                                           (mouse_x - self.x)))
         if not self.swiping:
             # making sword stay horizontally so that it points at a mouse
             self.sprite_angle = float(math.degrees(angle_to_mouse) - 90)
-        if pygame.mouse.get_pressed()[0]:
+        if input_state.mouse_buttons[0]:
             self.swiping = True  # sets swiping to True upon mouse click
             if self.swipe_direction == 0:
                 # checks if mouse button has just been clicked
@@ -60,7 +60,7 @@ class Swipe(Object):
                 self.swipe_angle += delta_time * 360
                 if self.swipe_angle >= 45:
                     self.swipe_direction = 1
-        if not pygame.mouse.get_pressed()[0]:
+        if not input_state.mouse_buttons[0]:
             # sets everything to default when mouse button is released
             self.swiping = False
             self.swipe_angle = 0
@@ -0,0 +1,83 @@
+import numpy
+import pygame
+
+from Assets import assets
+
+# Bits of a coast mask: which sides of a tile touch the sea
+NORTH = 1
+EAST = 2
+SOUTH = 4
+WEST = 8
+
+
+def coast_masks(tiles, water=-2):
+    """Returns a uint8 array (indexed [x][y] like tiles) holding, for every
+       tile, the NORTH/EAST/SOUTH/WEST bits of the neighbours that are
+       water. Tiles off the edge of the map count as land."""
+    wet = (numpy.asarray(tiles) == water).astype(numpy.uint8)
+    masks = numpy.zeros(wet.shape, numpy.uint8)
+    masks[:, 1:] |= wet[:, :-1] * NORTH
+    masks[:-1, :] |= wet[1:, :] * EAST
+    masks[:, :-1] |= wet[:, 1:] * SOUTH
+    masks[1:, :] |= wet[:-1, :] * WEST
+    return masks
+
+
+def coast_mask(tiles, x, y, water=-2):
+    """Returns the coast mask of the single tile x, y (see coast_masks)"""
+    size_x, size_y = len(tiles), len(tiles[0])
+    mask = 0
+    if y > 0 and tiles[x][y - 1] == water:
+        mask |= NORTH
+    if x < size_x - 1 and tiles[x + 1][y] == water:
+        mask |= EAST
+    if y < size_y - 1 and tiles[x][y + 1] == water:
+        mask |= SOUTH
+    if x > 0 and tiles[x - 1][y] == water:
+        mask |= WEST
+    return mask
+
+
+class CoastTileset:
+    """All 16 sand tile variants, one per coast mask, baked once into a
+    single surface. Variant n is the sand tile with a band of sea along
+    each side set in mask n."""
+    cache = dict()  # shared tilesets by (sand file, sea file, tile size)
+
+    surface = None  # 16 tiles wide, one tile high
+    tile_size = 0
+
+    @staticmethod
+    def get(sand_file, sea_file, tile_size):
+        """Returns the shared tileset for these images, building it the
+           first time"""
+        key = (sand_file, sea_file, tile_size)
+        if key not in CoastTileset.cache:
+            CoastTileset.cache[key] = CoastTileset(*key)
+        return CoastTileset.cache[key]
+
+    def __init__(self, sand_file, sea_file, tile_size):
+        size = tile_size
+        band = size / 4  # width of the sea band drawn along wet sides
+        sand = pygame.transform.scale(
+            assets.load_image(sand_file), (size, size))
+        sea = pygame.transform.scale(
+            assets.load_image(sea_file), (size, size))
+        bands = {NORTH: pygame.Rect(0, 0, size, band),
+                 EAST: pygame.Rect(size - band, 0, band, size),
+                 SOUTH: pygame.Rect(0, size - band, size, band),
+                 WEST: pygame.Rect(0, 0, band, size)}
+
+        self.tile_size = size
+        self.surface = pygame.Surface((size * 16, size)).convert()
+        for mask in range(16):
+            left = mask * size
+            self.surface.blit(sand, (left, 0))
+            for bit, rect in bands.iteritems():
+                if mask & bit:
+                    self.surface.blit(sea, rect.move(left, 0), rect)
+
+    def area(self, mask):
+        """Returns the part of the tileset surface holding a variant"""
+        return pygame.Rect(int(mask) * self.tile_size, 0,
+                           self.tile_size, self.tile_size)
@@ -0,0 +1,211 @@
+import math
+
+from Helpers import Vector, direction
+
+
+class SpatialHash:
+    """Points bucketed into square cells, for finding the ones in an area
+    without checking them all"""
+    cell_size = 2.0  # in tiles
+    cells = None  # (cell x, cell y): [item, ...]
+
+    def __init__(self, cell_size=2.0):
+        self.cell_size = float(cell_size)
+        self.cells = dict()
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, item, x, y):
+        """Adds an item at the point x, y"""
+        cell = (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+        self.cells.setdefault(cell, []).append(item)
+
+    def query(self, left, top, right, bottom):
+        """Returns the items in the cells overlapping an area. Items near
+           the area may be included too, so check them more closely."""
+        found = []
+        for cell_x in xrange(int(math.floor(left / self.cell_size)),
+                             int(math.floor(right / self.cell_size)) + 1):
+            for cell_y in xrange(int(math.floor(top / self.cell_size)),
+                                 int(math.floor(bottom / self.cell_size)) + 1):
+                items = self.cells.get((cell_x, cell_y))
+                if items:
+                    found.extend(items)
+        return found
+
+
+class ArcHitbox:
+    """The area a blade sweeps in one tick, turning about x, y from angle
+    start to angle end (in degrees, with the same convention as
+    sprite_angle). Sweeps go the short way round."""
+
+    def __init__(self, x, y, reach, start, end):
+        self.x = x
+        self.y = y
+        self.reach = reach  # length of the blade in tiles
+        sweep = (end - start + 180) % 360 - 180
+        self.middle = start + sweep / 2.0
+        self.half_sweep = abs(sweep) / 2.0
+
+    def bounds(self):
+        return (self.x - self.reach, self.y - self.reach,
+                self.x + self.reach, self.y + self.reach)
+
+    def centre(self):
+        return self.x, self.y
+
+    def hits(self, x, y, radius):
+        """Returns whether the circle at x, y is touched"""
+        gap = math.sqrt((x - self.x) ** 2 + (y - self.y) ** 2)
+        if gap > self.reach + radius:
+            return False
+        if gap <= radius:
+            return True  # right on top of the pivot
+        angle = math.degrees(direction((self.x, self.y), (x, y)))
+        off_middle = abs((angle - self.middle + 180) % 360 - 180)
+        return off_middle <= self.half_sweep + math.degrees(math.asin(radius / gap))
+
+
+class CapsuleHitbox:
+    """The area a circle of radius covers moving from x0, y0 to x1, y1 in
+    one tick (just the circle if it didn't move)"""
+
+    def __init__(self, x0, y0, x1, y1, radius):
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.radius = radius
+
+    def bounds(self):
+        return (min(self.x0, self.x1) - self.radius, min(self.y0, self.y1) - self.radius,
+                max(self.x0, self.x1) + self.radius, max(self.y0, self.y1) + self.radius)
+
+    def centre(self):
+        return self.x1, self.y1
+
+    def hits(self, x, y, radius):
+        """Returns whether the circle at x, y is touched"""
+        move_x = self.x1 - self.x0
+        move_y = self.y1 - self.y0
+        length_squared = move_x * move_x + move_y * move_y
+        along = 0.0
+        if length_squared > 0:
+            # Nearest point of the path to x, y, as a fraction along it
+            along = ((x - self.x0) * move_x + (y - self.y0) * move_y) / length_squared
+            along = min(max(along, 0.0), 1.0)
+        gap_x = x - (self.x0 + move_x * along)
+        gap_y = y - (self.y0 + move_y * along)
+        reach = self.radius + radius
+        return gap_x * gap_x + gap_y * gap_y <= reach * reach
+
+
+class Strike:
+    """A hitbox and what it does to whatever it touches"""
+
+    def __init__(self, hitbox, damage, knockback, struck):
+        self.hitbox = hitbox
+        self.damage = damage
+        self.knockback = knockback  # tiles/sec added away from the hitbox
+        self.struck = struck  # set of targets the attack already hit
+
+
+class Combat:
+    """Resolves attacks against targets in one batch per tick.
+
+    Attacks queue strikes while objects update; resolve then buckets the
+    targets near any strike into a spatial hash (only on ticks with
+    strikes), checks each strike against the targets near it, and applies
+    the summed damage and knockback to each target once. Targets need
+    health and a velocity Vector, and leave the game through the object
+    manager when their health runs out. An attack passes the same struck
+    set with each of its strikes, so it only hits a target once. Attacks
+    that find their own targets, like projectiles, queue hits instead."""
+    CELL_SIZE = 2.0  # spatial hash cell size in tiles
+    TARGET_MARGIN = 2.0  # most a target's centre can be from its x, y plus its radius, in tiles
+
+    strikes = None  # Strikes queued this tick
+    hits = None  # (target, damage, knockback Vector) queued this tick
+    index = None  # SpatialHash of target numbers
+
+    def __init__(self):
+        self.strikes = []
+        self.hits = []
+        self.index = SpatialHash(self.CELL_SIZE)
+
+    def strike(self, hitbox, damage, knockback, struck):
+        """Queues a strike to be resolved at the end of the tick"""
+        self.strikes.append(Strike(hitbox, damage, knockback, struck))
+
+    def hit(self, target, damage, knockback):
+        """Queues damage and a knockback Vector (in tiles/sec) for a
+           target already known to be hit"""
+        self.hits.append((target, damage, knockback))
+
+    @staticmethod
+    def target_circle(target):
+        """Returns the centre and radius of a target's collision box"""
+        box = target.collision
+        return (target.x + box.x + box.width / 2, target.y + box.y + box.height / 2,
+                (box.width + box.height) / 4)
+
+    def resolve(self, targets, object_list):
+        """Applies the queued strikes and hits to targets"""
+        damage = dict()  # target: damage
+        knockback = dict()  # target: Vector
+        for target, hit_damage, push in self.hits:
+            if not target.despawning:
+                damage[target] = damage.get(target, 0) + hit_damage
+                knockback[target] = knockback.get(target, Vector(0, 0)) + push
+        del self.hits[:]
+        if self.strikes:
+            self.resolve_strikes(targets, damage, knockback)
+
+        for target in damage:
+            target.health -= damage[target]
+            target.velocity += knockback[target]
+            if target.health <= 0:
+                object_list.despawn(target)
+            else:
+                object_list.wake(target)
+
+    def resolve_strikes(self, targets, damage, knockback):
+        """Adds what each target takes from the queued strikes to damage
+           and knockback"""
+        # Only targets near a strike can be hit, so only those are indexed
+        all_bounds = [strike.hitbox.bounds() for strike in self.strikes]
+        left = min(bounds[0] for bounds in all_bounds) - self.TARGET_MARGIN
+        top = min(bounds[1] for bounds in all_bounds) - self.TARGET_MARGIN
+        right = max(bounds[2] for bounds in all_bounds) + self.TARGET_MARGIN
+        bottom = max(bounds[3] for bounds in all_bounds) + self.TARGET_MARGIN
+
+        circles = dict()  # target number: (x, y, radius)
+        largest_radius = 0.0
+        self.index.clear()
+        for number, target in enumerate(targets):
+            if target.despawning or not (left <= target.x <= right and top <= target.y <= bottom):
+                continue
+            circle = self.target_circle(target)
+            circles[number] = circle
+            largest_radius = max(largest_radius, circle[2])
+            self.index.insert(number, circle[0], circle[1])
+
+        for strike in self.strikes:
+            left, top, right, bottom = strike.hitbox.bounds()
+            centre_x, centre_y = strike.hitbox.centre()
+            for number in self.index.query(left - largest_radius, top - largest_radius,
+                                           right + largest_radius, bottom + largest_radius):
+                target = targets[number]
+                x, y, radius = circles[number]
+                if target in strike.struck or not strike.hitbox.hits(x, y, radius):
+                    continue
+                strike.struck.add(target)
+                damage[target] = damage.get(target, 0) + strike.damage
+                push = Vector(x - centre_x, y - centre_y).normalise(strike.knockback)
+                knockback[target] = knockback.get(target, Vector(0, 0)) + push
+        del self.strikes[:]
+
+# Combat of the whole game
+combat = Combat()
@@ -3,6 +3,10 @@ import pygame
 from Objects import Object
 from Helpers import *
 from Map import MAP
+from Input import input_state
+from Assets import assets
+from Lighting import Light, lighting
+from Combat import ArcHitbox, CapsuleHitbox, combat
 
 
 class DynaAttack:
@@ -22,17 +26,33 @@ class DynaSword(Object):
     attack_target = None  # Vector position of boomerang target
     mouse_x = 0  # mouse position relative to world
     mouse_y = 0  # mouse position relative to world
+    save_fields = None  # recreated by the player, so never saved
+    light = None  # Light the sword glows with
+    LIGHT_RADIUS = 100  # pixels
+    LIGHT_COLOUR = (60, 90, 160)
+    struck = None  # enemies the current attack has hit
+    last_state = DynaAttack.NONE  # attack_state after the last update
+    SWIPE_DAMAGE = 1
+    SWIPE_KNOCKBACK = 6  # tiles/sec
+    BOOMERANG_DAMAGE = 1
+    BOOMERANG_KNOCKBACK = 4  # tiles/sec
+    BLOCK_KNOCKBACK = 8  # tiles/sec (blocking does no damage)
 
     def __init__(self, x, y):
-        self.sprite = pygame.image.load("graphics/sword.png")
+        self.sprite = assets.load_image("graphics/sword.png", True)
         self.x = x
         self.y = y
+        self.light = Light(self.LIGHT_RADIUS, self.LIGHT_COLOUR, self)
+        lighting.add(self.light)
         self.handle_origin = Vector(self.sprite.get_width() / 3,
                                     self.sprite.get_height())
         self.centre_origin = Vector(self.sprite.get_width() / 2,
                                     self.sprite.get_height() / 2)
 
     def update(self, delta_time, player, object_list, map):
+        # Remember where the sword was, to sweep hitboxes from
+        last_x, last_y, last_angle = self.x, self.y, self.sprite_angle
+
         # Set position
         hand_x = player.x + float(14) / MAP.TILE_SIZE
         hand_y = player.y + float(47) / MAP.TILE_SIZE
@@ -71,6 +91,23 @@ class DynaSword(Object):
             self.x = origin_x + ((self.attack_target.x - origin_x) * progress_factor)
             self.y = origin_y + ((self.attack_target.y - origin_y) * progress_factor)
 
+        # Hit whatever the sword passed through since the last update
+        if self.attack_state != self.last_state:
+            last_x, last_y, last_angle = self.x, self.y, self.sprite_angle
+        self.last_state = self.attack_state
+        if self.attack_state == DynaAttack.SWIPING:
+            combat.strike(ArcHitbox(self.x, self.y, float(self.sprite.get_height()) / MAP.TILE_SIZE,
+                                    last_angle, self.sprite_angle),
+                          self.SWIPE_DAMAGE, self.SWIPE_KNOCKBACK, self.struck)
+        elif self.attack_state == DynaAttack.BOOMERANGING:
+            combat.strike(CapsuleHitbox(last_x, last_y, self.x, self.y,
+                                        float(self.sprite.get_height()) / 2 / MAP.TILE_SIZE),
+                          self.BOOMERANG_DAMAGE, self.BOOMERANG_KNOCKBACK, self.struck)
+        elif self.attack_state == DynaAttack.BLOCKING:
+            combat.strike(CapsuleHitbox(self.x, self.y, self.x, self.y,
+                                        float(self.sprite.get_height()) / 2 / MAP.TILE_SIZE),
+                          0, self.BLOCK_KNOCKBACK, self.struck)
+
         # Decrement attack timer and stop if attack is over
         self.attack_timer -= delta_time
         if self.attack_timer < 0:
@@ -78,15 +115,13 @@ class DynaSword(Object):
             self.attack_state = DynaAttack.NONE
 
     def render(self, screen, camera):
-        self.mouse_x = (camera.x
-                        + float(pygame.mouse.get_pos()[0]) / MAP.TILE_SIZE)
-        self.mouse_y = (camera.y
-                        + float(pygame.mouse.get_pos()[1]) / MAP.TILE_SIZE)
+        self.mouse_x, self.mouse_y = input_state.mouse_world
         Object.render(self, screen, camera)
 
     def attack(self):
         if self.attack_state == DynaAttack.NONE:
             self.attack_state = DynaAttack.SWIPING
+            self.struck = set()
             self.attack_timer_start = 0.1
             self.attack_timer = 0.1
             self.attack_angle = math.degrees(direction(
@@ -96,6 +131,7 @@ class DynaSword(Object):
     def block(self):
         if self.attack_state == DynaAttack.NONE:
             self.attack_state = DynaAttack.BLOCKING
+            self.struck = set()
             self.attack_timer_start = 0.25
             self.attack_timer = 0.25
             self.attack_angle = math.degrees(direction(
@@ -105,6 +141,7 @@ class DynaSword(Object):
     def boomerang(self):
         if self.attack_state == DynaAttack.NONE:
             self.attack_state = DynaAttack.BOOMERANGING
+            self.struck = set()
             self.attack_target = Vector(self.mouse_x, self.mouse_y)
             self.attack_timer = 0.25 * distance((self.x, self.y),
                                                 self.attack_target)
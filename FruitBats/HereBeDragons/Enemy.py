@@ -3,6 +3,8 @@ import pygame
 from Characters import Character
 from Helpers import *
 from Collision import CollisionParams
+from AI import chase_decision
+from Animation import SpriteSheet, Animator, IDLE, WALK
 
 
 class ChaserEnemy(Character):
@@ -10,30 +12,110 @@ class ChaserEnemy(Character):
     acceleration = 20  # rate of acceleration, in tiles/sec/sec
     velocity = None  # current speed, as a Vector
     chasing = False  # whether currently chasing the player or not
+    MAX_HEALTH = 3
+    health = MAX_HEALTH  # hits left before dying (see Combat)
+    decision = None  # decision from an AIScheduler (None = decide here)
+    path = None  # tiles left to walk through to path_goal
+    path_goal = None  # tile the path (or pending path_request) leads to
+    path_request = None  # PathRequest still waiting in the pathfinder
+    WAYPOINT_RADIUS = 0.5  # how near, in tiles, counts as reaching a waypoint
+    PATH_SPEED = 3  # speed, in tiles/sec, to walk along a path at
+    wake_range = detection_range  # wake from sleep when the player is this close
+    save_fields = ("x", "y", "chasing")
+    pooled = True
+    # Frame table for graphics/enemy.png (one frame for now)
+    ANIMATIONS = {IDLE: (0, 1, 0.1, True),
+                  WALK: (0, 1, 0.1, True)}
 
     def __init__(self, x, y):
         self.x = float(x)
         self.y = float(y)
         self.collision = CollisionParams((10, 1), (39, 72), True)
-        self.sprite = pygame.image.load("graphics/enemy.png")
+        self.animator = Animator(
+            SpriteSheet.get("graphics/enemy.png").animations(self.ANIMATIONS))
+        self.sprite = self.animator.frame()
         self.velocity = Vector(0, 0)
 
+    def is_idle(self, player):
+        """Sleeps once stopped with the player out of range"""
+        return not self.chasing and self.velocity.length() == 0
+
+    def reset(self, x, y):
+        self.x = float(x)
+        self.y = float(y)
+        self.velocity = Vector(0, 0)
+        self.health = self.MAX_HEALTH
+        self.chasing = False
+        self.decision = None
+        self.drop_path()
+        self.animator.play(IDLE, True)
+
+    def save_state(self):
+        """Saves velocity along with save_fields"""
+        return Character.save_state(self) + (self.velocity.x, self.velocity.y)
+
+    def load_state(self, state):
+        Character.load_state(self, state[:-2])
+        self.velocity = Vector(state[-2], state[-1])
+
+    def follow_path(self):
+        """Returns the acceleration that turns the enemy towards the next
+           waypoint of its path at PATH_SPEED, or None without a path"""
+        # Move on from waypoints already reached
+        while self.path:
+            to_waypoint = Vector(self.path[0][0] + 0.5 - self.x,
+                                 self.path[0][1] + 0.5 - self.y)
+            if to_waypoint.length() > self.WAYPOINT_RADIUS:
+                steer = to_waypoint.normalise(self.PATH_SPEED) - self.velocity
+                return steer.normalise(self.acceleration)
+            self.path.pop(0)
+        return None
+
+    def set_path_request(self, goal, request):
+        """Takes the PathRequest for a path to the goal tile, made for the
+           enemy by an AIScheduler. The old path is kept until the new one
+           is found."""
+        if self.path_request is not None:
+            self.path_request.cancel()
+        self.path_goal = goal
+        self.path_request = request
+
+    def path_found(self, path):
+        """Pathfinder callback: keeps the path, without the tile the
+           enemy started on (an empty path if the goal can't be reached)"""
+        self.path_request = None
+        self.path = path[1:] if path is not None else []
+
+    def drop_path(self):
+        """Forgets the current path, cancelling it if still being found"""
+        if self.path_request is not None:
+            self.path_request.cancel()
+        self.path = None
+        self.path_goal = None
+        self.path_request = None
+
     def update(self, delta_time, player, object_list, map):
-        # Check if the player is in range
-        player_distance = distance((self.x, self.y), (player.x, player.y))
-        if player_distance <= self.detection_range:
-            self.chasing = True
-        else:
-            self.chasing = False
+        # Decide whether to chase the player, unless an AIScheduler
+        # already decided last tick
+        decision = self.decision
+        self.decision = None
+        if decision is None:
+            decision = chase_decision(self.x, self.y, player.x, player.y,
+                                      self.detection_range, self.acceleration)
+        self.chasing, accel_x, accel_y, path_needed = decision[:4]
 
-        # Chase the player if close
+        # Chase the player if close, going round anything in the way
         if self.chasing:
-            to_player = Vector(player.x - self.x, player.y - self.y)
-
-            self.velocity += to_player.normalise(
-                delta_time * self.acceleration
-                * (1 - player_distance / self.detection_range))
+            accel = Vector(accel_x, accel_y)
+            if path_needed:
+                accel = self.follow_path() or accel
+            else:
+                self.drop_path()
+            self.velocity += accel * delta_time
+        else:
+            self.drop_path()
 
         # Move according to velocity
         if not self.move(self.velocity * delta_time, object_list):
-            self.velocity = Vector(0, 0)
\ No newline at end of file
+            self.velocity = Vector(0, 0)
+        self.animator.update(self.velocity.length() > 0)
\ No newline at end of file
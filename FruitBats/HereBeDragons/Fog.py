@@ -1,31 +1,210 @@
+from collections import OrderedDict
+
+import numpy
 import pygame
 
-from Player import *
+from Map import MAP
 
 
 class Fog:
+    """Fog of war: a record of which tiles have been explored, with
+    unexplored ground hidden completely. (How far the player can see is
+    down to their light; see Lighting.)
+
+    explored is bit-packed, one bit per tile, and updated from the
+    player's tile each tick. Unexplored ground is drawn a chunk at a time:
+    unexplored chunks are filled black, fully explored ones are skipped,
+    and only partly explored chunks need a texture. Those are kept as one
+    alpha value per tile, filtered up to FILTER_PIXELS per tile, scaled
+    the rest of the way to the screen and cached, so drawing the fog only
+    costs as much as the chunks on screen. Exploring updates the cached
+    textures in place, redoing only the pixels around the newly explored
+    tiles."""
+    VISION_RADIUS = {True: 350, False: 150}  # pixels the player sees, by day and night
+    UNEXPLORED_COLOUR = (0, 0, 0)
+    MAX_CHUNK_TEXTURES = 6  # upscaled chunk textures kept (the least recently drawn go first)
+    FILTER_PIXELS = 40  # pixels per tile the fog's edges are filtered at (divides MAP.TILE_SIZE)
+
+    # Chunk states
+    UNEXPLORED = 0
+    PARTLY_EXPLORED = 1
+    EXPLORED = 2
 
-    SCREEN_WIDTH = 800*3
-    SCREEN_HEIGHT = 600*3
-    surface = None
     day = True
+    explored = None  # numpy uint8 array; tile x, y is bit 7 - y % 8 of explored[x][y / 8]
+    chunk_states = None  # (chunk x, chunk y): UNEXPLORED, PARTLY_EXPLORED or EXPLORED
+    chunk_textures = None  # OrderedDict (chunk x, chunk y): (alpha, filtered, texture), least recently drawn first
+    upscale = None  # numpy matrix turning a row of tiles into a row of filtered pixels (see filter_alpha)
+    listeners = None  # functions called with (chunk x, chunk y) when exploration changes
+    explored_from = None  # (tile x, tile y, day) explore was last called for
+
+    def __init__(self, explored=None):
+        """explored is a saved explored array (see SaveGame), or None to
+        start with nothing explored"""
+        if explored is None:
+            explored = numpy.zeros((MAP.SIZE_X, (MAP.SIZE_Y + 7) / 8), numpy.uint8)
+        self.explored = explored
+        self.chunk_states = dict()
+        self.chunk_textures = OrderedDict()
+        self.listeners = []
+
+    def update(self, player):
+        """Explores the tiles the player can see"""
+        self.explore(player.x + float(player.sprite.get_width()) / 2 / MAP.TILE_SIZE,
+                     player.y + float(player.sprite.get_height()) / 2 / MAP.TILE_SIZE)
+
+    def explore(self, x, y):
+        """Marks the tiles within sight of x, y (in tiles) as explored"""
+        centre_x, centre_y = int(x), int(y)
+        if (centre_x, centre_y, self.day) == self.explored_from:
+            return  # nothing new can be seen
+        self.explored_from = (centre_x, centre_y, self.day)
+
+        radius = float(self.VISION_RADIUS[self.day]) / MAP.TILE_SIZE
+        reach = int(radius)
+        xs, ys = numpy.mgrid[max(centre_x - reach, 0):min(centre_x + reach + 1, MAP.SIZE_X),
+                             max(centre_y - reach, 0):min(centre_y + reach + 1, MAP.SIZE_Y)]
+        seen = (xs - centre_x) ** 2 + (ys - centre_y) ** 2 <= radius * radius
+        xs, ys = xs[seen], ys[seen]
+        bits = (0x80 >> (ys & 7)).astype(numpy.uint8)
+        new = (self.explored[xs, ys >> 3] & bits) == 0
+        if not new.any():
+            return
+
+        xs, ys, bits = xs[new], ys[new], bits[new]
+        numpy.bitwise_or.at(self.explored, (xs, ys >> 3), bits)
+        for chunk, entry in self.chunk_textures.iteritems():
+            self.reveal(chunk, entry, xs, ys)
+        for chunk in set(zip(xs / MAP.CHUNK_SIZE, ys / MAP.CHUNK_SIZE)):
+            self.chunk_states.pop(chunk, None)
+            for listener in self.listeners:
+                listener(*chunk)
+
+    def explored_tiles(self, left, top, right, bottom):
+        """Returns a numpy bool array, indexed [x][y], of whether each tile
+        from left, top to right, bottom (exclusive) has been explored"""
+        first_byte = top / 8
+        bits = numpy.unpackbits(self.explored[left:right, first_byte:(bottom + 7) / 8], axis=1)
+        return bits[:, top - first_byte * 8:bottom - first_byte * 8].astype(numpy.bool_)
+
+    def is_explored(self, x, y):
+        """Returns whether tile x, y has been explored"""
+        return bool(self.explored[x][y >> 3] & (0x80 >> (y & 7)))
+
+    def chunk_state(self, chunk_x, chunk_y):
+        """Returns whether a chunk is UNEXPLORED, PARTLY_EXPLORED or EXPLORED"""
+        chunk = (chunk_x, chunk_y)
+        if chunk not in self.chunk_states:
+            explored = self.explored_tiles(chunk_x * MAP.CHUNK_SIZE, chunk_y * MAP.CHUNK_SIZE,
+                                           min((chunk_x + 1) * MAP.CHUNK_SIZE, MAP.SIZE_X),
+                                           min((chunk_y + 1) * MAP.CHUNK_SIZE, MAP.SIZE_Y))
+            if explored.all():
+                self.chunk_states[chunk] = self.EXPLORED
+            elif explored.any():
+                self.chunk_states[chunk] = self.PARTLY_EXPLORED
+            else:
+                self.chunk_states[chunk] = self.UNEXPLORED
+        return self.chunk_states[chunk]
+
+    def chunk_texture(self, chunk_x, chunk_y):
+        """Returns the texture covering a partly explored chunk's
+        unexplored tiles. It has a tile of border on each side, taken from
+        the neighbouring chunks so the soft edges match up."""
+        chunk = (chunk_x, chunk_y)
+        entry = self.chunk_textures.pop(chunk, None)
+        if entry is None:
+            size = MAP.CHUNK_SIZE + 2
+            left = chunk_x * MAP.CHUNK_SIZE - 1
+            top = chunk_y * MAP.CHUNK_SIZE - 1
+            alpha = numpy.empty((size, size), numpy.uint8)
+            alpha.fill(255)  # off the map counts as unexplored
+            clip_left, clip_top = max(left, 0), max(top, 0)
+            clip_right, clip_bottom = min(left + size, MAP.SIZE_X), min(top + size, MAP.SIZE_Y)
+            explored = self.explored_tiles(clip_left, clip_top, clip_right, clip_bottom)
+            alpha[clip_left - left:clip_right - left, clip_top - top:clip_bottom - top][explored] = 0
+
+            filtered = pygame.Surface((size * self.FILTER_PIXELS, size * self.FILTER_PIXELS),
+                                      pygame.SRCALPHA, 32)
+            filtered.fill(self.UNEXPLORED_COLOUR)
+            self.filter_alpha(alpha, filtered, 0, 0, size, size)
+            texture = pygame.transform.scale(filtered, (size * MAP.TILE_SIZE, size * MAP.TILE_SIZE))
+            entry = (alpha, filtered, texture)
+
+        # (Re)insert as the most recently drawn
+        self.chunk_textures[chunk] = entry
+        while len(self.chunk_textures) > self.MAX_CHUNK_TEXTURES:
+            self.chunk_textures.popitem(last=False)
+        return entry[2]
+
+    def reveal(self, chunk, entry, xs, ys):
+        """Clears the newly explored tiles xs, ys from a cached chunk
+        texture, redrawing just the pixels around them"""
+        alpha, filtered, texture = entry
+        size = MAP.CHUNK_SIZE + 2
+        local_x = xs - (chunk[0] * MAP.CHUNK_SIZE - 1)
+        local_y = ys - (chunk[1] * MAP.CHUNK_SIZE - 1)
+        inside = (local_x >= 0) & (local_x < size) & (local_y >= 0) & (local_y < size)
+        if not inside.any():
+            return
+        local_x, local_y = local_x[inside], local_y[inside]
+        alpha[local_x, local_y] = 0
+
+        # Filtering blends each pixel with the tiles either side of it
+        left, top = max(local_x.min() - 1, 0), max(local_y.min() - 1, 0)
+        right, bottom = min(local_x.max() + 2, size), min(local_y.max() + 2, size)
+        self.filter_alpha(alpha, filtered, left, top, right, bottom)
+        area = pygame.Rect(left * self.FILTER_PIXELS, top * self.FILTER_PIXELS,
+                           (right - left) * self.FILTER_PIXELS, (bottom - top) * self.FILTER_PIXELS)
+        scaled = pygame.transform.scale(filtered.subsurface(area),
+                                        ((right - left) * MAP.TILE_SIZE, (bottom - top) * MAP.TILE_SIZE))
+        # Replace the pixels there: the colours match, so the larger alpha is the new one
+        position = (left * MAP.TILE_SIZE, top * MAP.TILE_SIZE)
+        texture.fill(self.UNEXPLORED_COLOUR + (0,), scaled.get_rect(topleft=position))
+        texture.blit(scaled, position, special_flags=pygame.BLEND_RGBA_MAX)
+
+    def filter_alpha(self, alpha, filtered, left, top, right, bottom):
+        """Draws the tiles from left, top to right, bottom (exclusive) of
+        a chunk's alpha values into the alpha of its filtered surface,
+        with bilinear filtering. Any area gives the same pixels as
+        filtering the lot."""
+        if self.upscale is None:
+            # Each pixel's weights for the centres of the tiles around it
+            size = MAP.CHUNK_SIZE + 2
+            pixels = numpy.arange(size * self.FILTER_PIXELS)
+            position = (pixels + 0.5) / self.FILTER_PIXELS - 0.5
+            first = numpy.clip(numpy.floor(position).astype(numpy.intp), 0, size - 1)
+            second = numpy.minimum(first + 1, size - 1)
+            weight = numpy.clip(position - first, 0.0, 1.0)
+            Fog.upscale = numpy.zeros((size * self.FILTER_PIXELS, size), numpy.float32)
+            numpy.add.at(Fog.upscale, (pixels, first), 1.0 - weight)
+            numpy.add.at(Fog.upscale, (pixels, second), weight)
 
-    def __init__(self):
-        self.surface = self.lift_fog()
-
-    def lift_fog(self):
-        """Creates a black surface and then renders a circle getting less transparent as it
-        spreads out, if its night time the circle of vision is much smaller"""
-        self.surface = pygame.Surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.SRCALPHA)
-        self.surface.fill((0, 0, 0, 255))
-        if self.day:
-            m = 255/float(350)  # float used to multiply i increasing the alpha must be close
-            # to range to avoid alpha being higher than 255
-            for i in range(350, 1, -1):  # loop starts at first number and counts down by 1 until at 1
-                pygame.draw.circle(self.surface, (0, 0, 0, i*m), (self.SCREEN_WIDTH/2, self.SCREEN_HEIGHT/2), i)
-        else:
-            m = 255/float(150)
-            for i in range(150, 1, -1):
-                pygame.draw.circle(self.surface, (0, 0, 0, i*m), (self.SCREEN_WIDTH/2, self.SCREEN_HEIGHT/2), i)
-        return self.surface
+        tile = self.FILTER_PIXELS
+        rows = self.upscale[left * tile:right * tile]
+        columns = self.upscale[top * tile:bottom * tile]
+        values = numpy.dot(numpy.dot(rows, alpha.astype(numpy.float32)), columns.T)
+        pixels = pygame.surfarray.pixels_alpha(filtered)
+        pixels[left * tile:right * tile, top * tile:bottom * tile] = values + 0.5
+        del pixels  # unlock the surface
 
+    def render(self, screen, camera):
+        """Covers the unexplored ground in the chunks on screen"""
+        chunk_pixels = MAP.CHUNK_SIZE * MAP.TILE_SIZE
+        offset_x = int(camera.x * MAP.TILE_SIZE)
+        offset_y = int(camera.y * MAP.TILE_SIZE)
+        last_chunk_x = min((offset_x + screen.get_width()) / chunk_pixels,
+                           (MAP.SIZE_X - 1) / MAP.CHUNK_SIZE)
+        last_chunk_y = min((offset_y + screen.get_height()) / chunk_pixels,
+                           (MAP.SIZE_Y - 1) / MAP.CHUNK_SIZE)
+        for chunk_x in xrange(max(offset_x / chunk_pixels, 0), last_chunk_x + 1):
+            for chunk_y in xrange(max(offset_y / chunk_pixels, 0), last_chunk_y + 1):
+                state = self.chunk_state(chunk_x, chunk_y)
+                if state == self.EXPLORED:
+                    continue
+                rect = pygame.Rect(chunk_x * chunk_pixels - offset_x, chunk_y * chunk_pixels - offset_y,
+                                   chunk_pixels, chunk_pixels)
+                if state == self.UNEXPLORED:
+                    screen.fill(self.UNEXPLORED_COLOUR, rect)
+                else:
+                    screen.blit(self.chunk_texture(chunk_x, chunk_y), rect.topleft,
+                                pygame.Rect(MAP.TILE_SIZE, MAP.TILE_SIZE, chunk_pixels, chunk_pixels))
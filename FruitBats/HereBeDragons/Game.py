@@ -1,4 +1,7 @@
+import os
+import sys
 import time
+import argparse
 import random
 
 import pygame
@@ -9,12 +12,22 @@ from Attack import Swipe
 from Enemy import ChaserEnemy
 from Map import MapClass, MAP
 from Camera import Camera
-from Menu import *
-from Invent import *
+from Menu import MenuScene
+from Invent import Inventory, InventoryScene
 from Fog import Fog
-
-from SpriteGeneration import character_creation
-from SpriteGeneration import Sprite
+from Minimap import Minimap
+from Lighting import Light, Lighting, lighting
+from Combat import combat
+from Projectiles import projectiles
+from Pathfinding import Pathfinder
+from Loading import WorldLoader, LoadingScene
+from SaveGame import SaveGame, SaveWriter
+from Input import input_state, InputRecorder, InputPlayer
+from AI import AIScheduler
+from ObjectManager import ObjectManager
+from Animation import SpriteSheet, animation_clock
+from Scene import Scene, SceneManager, PauseScene, CreationScene
+from Assets import assets
 
 
 class Game:
@@ -22,125 +35,420 @@ class Game:
     tick_time = 0   # time at the start of the frame, in seconds since
                     # the game started
     start_time = 0  # initial time.clock() value on startup (OS-dependent)
-    t0 = time.time()
+    day_timer = 0   # game time since day last changed to night or back
+    DAY_LENGTH = 10  # seconds between day and night changing
     screen = None   # PyGame screen
     camera = None   # movable camera object
-    objects = None  # list of active objects in the game
+    objects = None  # ObjectManager holding the active objects in the game
     player = None   # pointer to the player object
     map = None      # MapClass object
-    quitting = False
-    menu = None
+    seed = 0        # map seed (0 = new random map every time)
+    world_loader = None  # WorldLoader generating the map in the background
+    pathfinder = None  # Pathfinder used by enemies to navigate the map
+    load_save = False  # continue from save_file instead of a new game
+    save_file = SaveGame.DEFAULT_FILE
+    save_writer = None  # SaveWriter writing saves in the background
+    AUTOSAVE_INTERVAL = 60  # seconds between autosaves
+    recorder = None  # InputRecorder, when recording input
+    replay = None    # InputPlayer, when replaying recorded input
+    headless = False  # run without a visible window (for replays)
+    fixed_timestep = None  # if set, every tick advances by this many seconds
+    frame_times = None  # real seconds taken by each tick of a replay
+    ai_workers = 0  # processes for enemy AI (0 = decide on the main thread)
+    ai_scheduler = None  # AIScheduler deciding for the enemies
+    profile = False  # print how long startup took
+    scenes = None  # SceneManager running the menus and gameplay
+    saved = None  # save being continued from, if any
+    inventory_scene = None  # InventoryScene shown when I is pressed
+    last_save_time = 0  # time.time() of the last autosave
+    last_tick_wall_time = None  # time.time() at the start of the last tick
+    launch_time = 0  # time.time() when run() started
+    loading = None  # LoadingScene building the world
+    minimap = None  # Minimap drawn over the game
+    player_light = None  # Light around the player, smaller at night
+    PLAYER_LIGHT_COLOUR = (200, 200, 200)
+    PREFETCH_IMAGES = ([filename for weight, filename in MAP.TILE_INFO] +
+                       [filename for [filename] in MAP.SEA_TILE] +
+                       ["graphics/game_character.png", "graphics/enemy.png",
+                        "graphics/pikachu.png", "graphics/sword.png",
+                        "graphics/inventory_image.png"])
+    PLAYER_SPRITE = "player_sprite"  # file the created character is saved to
     SCREEN_WIDTH = 800  # 640
     SCREEN_HEIGHT = 600  # 480
 
     new_game = True    # If the player needs to create a character or not. For testing only currently.
 
-    def __init__(self):
+    def __init__(self, seed=0, load_save=False, record=None, replay=None,
+                 headless=False, fixed_timestep=None, frame_times_file=None,
+                 ai_workers=0, profile=False):
+        """Starts the game. record and replay are input log file names;
+           frame_times_file receives the tick times of a replay."""
+        self.seed = seed
+        self.ai_workers = ai_workers
+        self.profile = profile
+        self.load_save = load_save
+        self.headless = headless
+        self.fixed_timestep = fixed_timestep
+        if replay is not None:
+            self.replay = InputPlayer(replay)
+            self.seed = self.replay.seed
+        elif record is not None:
+            if self.seed == 0:
+                self.seed = random.randint(1, 2 ** 31 - 1)  # replays need it
+            self.recorder = InputRecorder(record, self.seed)
         self.run()
+        if self.replay is not None:
+            self.report_frame_times(frame_times_file)
 
     def run(self):
         """Runs the game -- game closes when this function ends.
            To be called on startup."""
         # Init Python
+        self.launch_time = time.time()
+        if self.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
         pygame.init()
         self.screen = pygame.display.set_mode((self.SCREEN_WIDTH,
                                                self.SCREEN_HEIGHT))
 
         pygame.display.set_caption('Frontier')
 
-        menu = GameMenu(self.screen)
-        menu.run()
-
-        if self.new_game:
-            # Character creation goes here
-            character_creation.load_creation_window(self.screen)
-
-        # Init map
-        self.map = MapClass()
+        # Read the save to continue from, if any
+        if self.load_save and os.path.exists(self.save_file):
+            self.saved = SaveGame.read(self.save_file)
+            self.seed = self.saved["seed"]
+            self.new_game = False
+
+        # Start generating the map while the menu is open
+        self.world_loader = WorldLoader(self.seed)
+        if self.saved is not None:
+            self.world_loader.tiles = self.saved["tiles"]
+            self.world_loader.sea = self.saved["sea"]
+        else:
+            self.world_loader.start()
+
+        # Load the game's assets while the menu is open too
+        self.prefetch_assets()
+
+        # Menu, then character creation (for a new game), then loading;
+        # replays go straight to loading
+        self.loading = LoadingScene(self.world_loader, self.start_world)
+        scene = self.loading
+        if self.replay is None:
+            if self.new_game:
+                scene = CreationScene(scene)
+            scene = MenuScene(scene)
+
+        self.scenes = SceneManager(self.screen)
+        self.scenes.push(scene)
+        self.scenes.run()
+
+    def prefetch_assets(self):
+        """Starts loading the assets gameplay needs on worker threads"""
+        assets.prefetch_images(self.PREFETCH_IMAGES)
+        for day in (True, False):
+            Lighting.prefetch(Fog.VISION_RADIUS[day], self.PLAYER_LIGHT_COLOUR)
+        if not self.new_game:
+            # Otherwise the sprite isn't made until character creation
+            assets.prefetch(self.PLAYER_SPRITE, self.load_player_sprite,
+                            self.PLAYER_SPRITE)
+
+    @staticmethod
+    def load_player_sprite(filename):
+        """Reads the created character's sprite. The sprite generator is
+           only imported here, so importing the game doesn't load it."""
+        from SpriteGeneration import Sprite
+        return Sprite.deserialize(filename)
+
+    def start_world(self, map):
+        """Sets up the game world on the loaded map and switches to the
+           gameplay scene"""
+        self.map = map
+
+        # Init fog, with the explored ground from the save if there is one
+        if self.saved is not None:
+            self.fog = Fog(self.saved["explored"])
+        else:
+            self.fog = Fog()
 
-        # Init fog
-        self.fog = Fog()
+        # Init inventory
+        self.invent = Inventory()
+        self.inventory_scene = InventoryScene(self.invent)
+
+        saved = self.saved
+        self.objects = ObjectManager()
+        if saved is not None:
+            # Restore objects and player from the save
+            restored = SaveGame.create_objects(saved)
+            for obj in restored:
+                self.objects.add(obj)
+            self.player = restored[0]
+            self.invent.current_inventory = saved["inventory"]
+            self.fog.day = saved["day"]
+        else:
+            # Init objects and player
+            self.player = self.objects.spawn(Player, 0, 0)  # always first
+
+            # Add test Pikachi (Pikachodes?) (plural?)
+            # (placed from the seed so recorded sessions replay the same)
+            spawn_random = random.Random(self.seed or None)
+            for i in xrange(10):
+                self.objects.spawn(PikachuStatue, spawn_random.randint(0, 10),
+                                   spawn_random.randint(0, 10))
+            # Add test sword
+            self.objects.spawn(Swipe, 3, 3)
+
+            # Init test enemy at 5,5
+            self.objects.spawn(ChaserEnemy, 3, 3)
+        self.objects.flush()
 
         # Init character
-        self.player = Player(0, 0)
-        self.player.sprite = Sprite.deserialize("player_sprite").image
+        player_sprite = assets.get(self.PLAYER_SPRITE, self.load_player_sprite,
+                                   self.PLAYER_SPRITE)
+        self.player.set_sprite_sheet(SpriteSheet.from_surface(
+            self.PLAYER_SPRITE, player_sprite.image))
 
-        # Init inventory
-        self.invent = Inventory()
+        # Init the player's light
+        self.player_light = Light(Fog.VISION_RADIUS[self.fog.day],
+                                  self.PLAYER_LIGHT_COLOUR, self.player,
+                                  float(self.player.sprite.get_width()) / 2 / MAP.TILE_SIZE,
+                                  float(self.player.sprite.get_height()) / 2 / MAP.TILE_SIZE)
+        lighting.add(self.player_light)
 
-        # Init objects and player
-        self.objects = list()
-        self.objects.append(self.player)  # player is always the first item
+        # Stop thrown projectiles at the sea
+        projectiles.set_map(self.map)
+
+        # Init minimap
+        self.minimap = Minimap(self.map, self.fog)
 
         # Init camera
         self.camera = Camera(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
 
-        # Add test Pikachi (Pikachodes?) (plural?)
-        for i in xrange(10):
-            self.objects.append(PikachuStatue(random.randint(0, 10),
-                                              random.randint(0, 10)))
-        # Add test sword
-        self.objects.append(Swipe(3, 3))
+        # Init pathfinding, with statues blocking their tiles
+        self.pathfinder = Pathfinder(self.map)
+        for obj in self.objects.of_type(PikachuStatue):
+            self.pathfinder.set_blocked(int(obj.x), int(obj.y), True)
+
+        # Init enemy AI, on workers if asked for
+        self.ai_scheduler = AIScheduler(self.pathfinder, self.ai_workers)
 
-        # Init test enemy at 5,5
-        self.objects.append(ChaserEnemy(3, 3))
+        # Init saving
+        self.save_writer = SaveWriter()
+        self.last_save_time = time.time()
 
         # Init main game parameters
         self.start_time = time.clock()
+        self.tick_time = self.start_time
         self.delta_time = 0.0
-
-        # Main loop
-        while not self.quitting:
-            # Update timing
-            last_time = self.tick_time
-            self.tick_time = time.clock()
-
-            self.delta_time = self.tick_time - last_time
-
-            # Change day to true or false every #seconds, calls fog function to update surface
-            seconds = 10
-            t1 = time.time()
-            dt = t1 - self.t0  # gets difference in start time and current time
-            if dt >= seconds:
-                self.fog.day = not self.fog.day
-                self.t0 = t1  # resets timer variable
-                self.fog.lift_fog()
+        self.frame_times = []
+
+        self.scenes.replace(GameplayScene(self))
+
+    def tick(self, delta_time, events):
+        """Runs one tick of the game. delta_time comes from the shared
+           scene clock; events are this tick's PyGame events."""
+        # Time between ticks, for replay reports
+        now = time.time()
+        if self.last_tick_wall_time is not None:
+            self.frame_times.append(now - self.last_tick_wall_time)
+        self.last_tick_wall_time = now
+        self.tick_time = time.clock()
+
+        if self.replay is not None:
+            # Take input and timing from the recording
+            self.delta_time = self.replay.play(input_state, self.camera)
+            if self.delta_time is None:
+                self.scenes.quit()  # end of the recording
+                return
+        else:
+            self.delta_time = delta_time
+            if self.fixed_timestep is not None:
+                self.delta_time = self.fixed_timestep
 
             # Cap delta time to 10FPS to prevent gamebreaking bugs
             if self.delta_time >= 0.1:
                 self.delta_time = 0.1
 
-            # Perform PyGame event loop
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT or \
-                        (event.type == pygame.KEYDOWN and
-                         event.key == pygame.K_ESCAPE):
-                    self.quitting = True
-
-            # Update objects (including player)
-            for obj in self.objects:
-                obj.update(self.delta_time, self.player, self.objects, map)
-
-            # Update camera
-            self.camera.update(self.delta_time, self.player, self.objects, map)
-
-            # Render (todo: move into separate Render class?)
-            self.screen.blit(self.map.img, (-self.camera.x * MAP.TILE_SIZE, -self.camera.y * MAP.TILE_SIZE))
-
-            for obj in self.objects:
-                obj.render(self.screen, self.camera)
-            self.player.render(self.screen, self.camera)
-
-            # Render fog
-            self.screen.blit(self.fog.surface, ((self.player.x - self.camera.x) * MAP.TILE_SIZE - int(self.SCREEN_WIDTH*1.5 - self.player.sprite.get_width()/2),
-                                                (self.player.y - self.camera.y) * MAP.TILE_SIZE - int(self.SCREEN_HEIGHT*1.5 - self.player.sprite.get_height()/2)))
-
-            # Update inventory
-            self.invent.update()
-            self.invent.render_invent(self.screen)
+            input_state.update(events, self.camera)
+            if self.recorder is not None:
+                self.recorder.record(self.delta_time, input_state)
+
+        # Change day to true or false every DAY_LENGTH seconds of game
+        # time, changing how far the player's light reaches
+        self.day_timer += self.delta_time
+        if self.day_timer >= self.DAY_LENGTH:
+            self.fog.day = not self.fog.day
+            self.day_timer = 0  # resets timer variable
+            self.player_light.radius = Fog.VISION_RADIUS[self.fog.day]
+
+        if input_state.key_pressed(pygame.K_ESCAPE):
+            self.scenes.quit()
+            return
+
+        # Open or close the inventory over the game
+        if input_state.key_pressed(pygame.K_i):
+            if self.inventory_scene.manager is None:
+                self.scenes.push(self.inventory_scene)
+            else:
+                self.scenes.pop()
+
+        # Pause (not part of the recorded input, so never while replaying)
+        if self.replay is None:
+            for event in events:
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    self.scenes.push(PauseScene())
+                    break
+
+        # Advance every animation at once
+        animation_clock.tick(self.delta_time)
+
+        # Add and remove the objects queued during the last tick
+        self.objects.flush()
+
+        # Hand out the AI decisions made during the last tick
+        self.ai_scheduler.collect()
+
+        # Update objects (including player), skipping sleeping ones and
+        # updating distant ones less often
+        self.objects.update(self.delta_time, self.player, self.map,
+                            self.camera)
+
+        # Move projectiles, which may hit enemies
+        projectiles.update(self.delta_time, self.objects.of_type(ChaserEnemy))
+
+        # Apply this tick's attacks to the enemies, all at once
+        combat.resolve(self.objects.of_type(ChaserEnemy), self.objects)
+
+        # Start deciding for the next tick while this one renders
+        self.ai_scheduler.dispatch(
+            [enemy for enemy in self.objects.of_type(ChaserEnemy)
+             if not enemy.asleep], self.player)
+
+        # Run queued path searches within this frame's time budget (or
+        # all of them when recording or replaying, so replays match)
+        if self.recorder is None and self.replay is None:
+            self.pathfinder.update()
+        else:
+            self.pathfinder.update(None)
+
+        # Update camera
+        self.camera.update(self.delta_time, self.player, self.objects, self.map)
+
+        # Explore around the player
+        self.fog.update(self.player)
+
+        # Autosave in the background every so often
+        if self.replay is None and \
+                time.time() - self.last_save_time >= self.AUTOSAVE_INTERVAL:
+            self.save()
+            self.last_save_time = time.time()
+
+    def render(self):
+        """Draws the game world"""
+        # Render (todo: move into separate Render class?)
+        self.screen.blit(self.map.img, (-self.camera.x * MAP.TILE_SIZE, -self.camera.y * MAP.TILE_SIZE))
+
+        for obj in self.objects:
+            obj.render(self.screen, self.camera)
+        self.player.render(self.screen, self.camera)
+        projectiles.render(self.screen, self.camera)
+
+        # Render lighting, then hide unexplored ground
+        lighting.render(self.screen, self.camera)
+        self.fog.render(self.screen, self.camera)
+
+        # Render minimap
+        self.minimap.update(self.player, self.objects.of_type(ChaserEnemy))
+        self.minimap.render(self.screen)
+
+    def shutdown(self):
+        """Stops background work and saves, on the way out of the game"""
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.ai_scheduler is not None:
+            self.ai_scheduler.close()
+
+        # Save on the way out, waiting for it to finish
+        if self.replay is None:
+            self.save()
+            self.save_writer.wait()
+
+    def report_first_frame(self):
+        """Prints how long it took to get from launch, and from leaving the
+           menus, to the first frame of gameplay"""
+        now = time.time()
+        print("First frame: %.2fs after launch, %.2fs after the menus "
+              "(%.2fs waiting on assets)" % (
+                  now - self.launch_time, now - self.loading.start_time,
+                  assets.wait_time))
+
+    def report_frame_times(self, path=None):
+        """Prints a summary of the replay's frame times and optionally
+           writes them (in milliseconds, one per line) to path"""
+        times = sorted(self.frame_times)
+        if not times:
+            return
+        print("Frames: %d  mean: %.2fms  median: %.2fms  95%%: %.2fms  "
+              "99%%: %.2fms  max: %.2fms" % (
+                  len(times), 1000 * sum(times) / len(times),
+                  1000 * times[len(times) / 2],
+                  1000 * times[int(len(times) * 0.95)],
+                  1000 * times[int(len(times) * 0.99)],
+                  1000 * times[-1]))
+        if path is not None:
+            with open(path, "w") as f:
+                for frame_time in self.frame_times:
+                    f.write("%.3f\n" % (1000 * frame_time))
+
+    def save(self):
+        """Snapshots the game and writes it to save_file in the background"""
+        self.save_writer.save(self.save_file, SaveGame.snapshot(self))
+
+class GameplayScene(Scene):
+    """The game itself, as a scene"""
+    frame_rate = 0  # run as fast as possible
+
+    game = None
+    rendered = False  # whether the first frame has been drawn
+
+    def __init__(self, game):
+        self.game = game
+
+    def exit(self):
+        self.game.shutdown()
+
+    def update(self, delta_time, events):
+        self.game.tick(delta_time, events)
+
+    def render(self, screen):
+        self.game.render()
+        if not self.rendered:
+            self.rendered = True
+            if self.game.profile:
+                self.game.report_first_frame()
 
-            # Splat to screen
-            pygame.display.flip()
 
 # Startup game!
-Game()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Here Be Dragons")
+    parser.add_argument("seed", type=int, nargs="?", default=0,
+                        help="map seed (0 = random map)")
+    parser.add_argument("--continue", dest="load_save", action="store_true",
+                        help="continue from the last save")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record input to FILE")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay input recorded with --record")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window (use with --replay)")
+    parser.add_argument("--timestep", type=float, metavar="SECONDS",
+                        help="advance every tick by a fixed time")
+    parser.add_argument("--frame-times", metavar="FILE",
+                        help="write replay frame times (ms) to FILE")
+    parser.add_argument("--ai-workers", type=int, default=0, metavar="N",
+                        help="run enemy AI on N worker processes")
+    parser.add_argument("--profile", action="store_true",
+                        help="print how long it took to reach gameplay")
+    args = parser.parse_args()
+    Game(args.seed, args.load_save, args.record, args.replay, args.headless,
+         args.timestep, args.frame_times, args.ai_workers, args.profile)
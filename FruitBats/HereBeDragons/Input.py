@@ -0,0 +1,199 @@
+import struct
+
+import pygame
+
+from Map import MAP
+
+# Keys the game reads during play; only these are recorded
+TRACKED_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d,
+                pygame.K_i, pygame.K_ESCAPE, pygame.K_f)
+
+
+class InputState:
+    """Player input for the current tick, built once per tick from the
+    PyGame event queue. Gameplay code reads input from here rather than
+    polling PyGame itself, so every object sees the same input and a
+    recorded session can be fed back in exactly (see InputRecorder and
+    InputPlayer)."""
+    keys_held = frozenset()      # keys currently held down
+    keys_pressed = frozenset()   # keys that went down this tick
+    keys_released = frozenset()  # keys that came up this tick
+    mouse_buttons = (False, False, False)  # left, middle, right held
+    buttons_pressed = (False, False, False)   # went down this tick
+    buttons_released = (False, False, False)  # came up this tick
+    mouse_pos = (0, 0)    # mouse position on screen, in pixels
+    mouse_world = (0, 0)  # mouse position in the world, in tiles
+
+    def update(self, events, camera=None):
+        """Builds this tick's state from the events taken off the PyGame
+           queue this tick. camera converts the mouse to world space."""
+        held = set(self.keys_held)
+        pressed = set()
+        released = set()
+        buttons = list(self.mouse_buttons)
+        buttons_pressed = [False, False, False]
+        buttons_released = [False, False, False]
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                held.add(event.key)
+                pressed.add(event.key)
+            elif event.type == pygame.KEYUP:
+                held.discard(event.key)
+                released.add(event.key)
+            elif event.type == pygame.MOUSEBUTTONDOWN and 1 <= event.button <= 3:
+                buttons[event.button - 1] = True
+                buttons_pressed[event.button - 1] = True
+            elif event.type == pygame.MOUSEBUTTONUP and 1 <= event.button <= 3:
+                buttons[event.button - 1] = False
+                buttons_released[event.button - 1] = True
+            elif event.type == pygame.MOUSEMOTION:
+                self.mouse_pos = event.pos
+            elif (event.type == pygame.ACTIVEEVENT and not event.gain and
+                  event.state & pygame.APPINPUTFOCUS):
+                # Lost focus: key and button ups won't reach us any more
+                released.update(held)
+                held.clear()
+                buttons = [False, False, False]
+
+        self.keys_held = frozenset(held)
+        self.keys_pressed = frozenset(pressed)
+        self.keys_released = frozenset(released)
+        self.mouse_buttons = tuple(buttons)
+        self.buttons_pressed = tuple(buttons_pressed)
+        self.buttons_released = tuple(buttons_released)
+        self.update_world(camera)
+
+    def update_world(self, camera):
+        """Works out mouse_world from mouse_pos and the camera"""
+        if camera is None:
+            self.mouse_world = (float(self.mouse_pos[0]) / MAP.TILE_SIZE,
+                                float(self.mouse_pos[1]) / MAP.TILE_SIZE)
+        else:
+            self.mouse_world = (camera.x + float(self.mouse_pos[0]) / MAP.TILE_SIZE,
+                                camera.y + float(self.mouse_pos[1]) / MAP.TILE_SIZE)
+
+    def key_held(self, key):
+        """Returns True if key is held down"""
+        return key in self.keys_held
+
+    def key_pressed(self, key):
+        """Returns True if key went down this tick"""
+        return key in self.keys_pressed
+
+    def key_released(self, key):
+        """Returns True if key came up this tick"""
+        return key in self.keys_released
+
+    @staticmethod
+    def pack_keys(keys):
+        """Packs a set of keys into an int, one bit per TRACKED_KEYS entry"""
+        bits = 0
+        for index, key in enumerate(TRACKED_KEYS):
+            if key in keys:
+                bits |= 1 << index
+        return bits
+
+    @staticmethod
+    def unpack_keys(bits):
+        """Reverses pack_keys"""
+        return frozenset(key for index, key in enumerate(TRACKED_KEYS)
+                         if bits & (1 << index))
+
+    @staticmethod
+    def pack_buttons(buttons):
+        """Packs a tuple of mouse button flags into an int"""
+        bits = 0
+        for index, flag in enumerate(buttons):
+            if flag:
+                bits |= 1 << index
+        return bits
+
+    @staticmethod
+    def unpack_buttons(bits):
+        """Reverses pack_buttons"""
+        return tuple(bool(bits & (1 << index)) for index in range(3))
+
+    def pack(self):
+        """Returns the tracked state as a tuple of ints (see InputLog)"""
+        return (self.pack_keys(self.keys_held),
+                self.pack_keys(self.keys_pressed),
+                self.pack_keys(self.keys_released),
+                self.pack_buttons(self.mouse_buttons),
+                self.pack_buttons(self.buttons_pressed),
+                self.pack_buttons(self.buttons_released),
+                self.mouse_pos[0], self.mouse_pos[1])
+
+    def unpack(self, values, camera=None):
+        """Sets the state from a tuple returned by pack"""
+        self.keys_held = self.unpack_keys(values[0])
+        self.keys_pressed = self.unpack_keys(values[1])
+        self.keys_released = self.unpack_keys(values[2])
+        self.mouse_buttons = self.unpack_buttons(values[3])
+        self.buttons_pressed = self.unpack_buttons(values[4])
+        self.buttons_released = self.unpack_buttons(values[5])
+        self.mouse_pos = (values[6], values[7])
+        self.update_world(camera)
+
+
+# Input shared by every object for the current tick
+input_state = InputState()
+
+
+class InputLog:
+    """Binary input log format.
+
+    Header: magic "HBDI", format version (uint16), map seed (int64).
+    Then one frame per tick: delta time (float64), held, pressed and
+    released key bits (uint16 each), held, pressed and released mouse
+    button bits (uint8 each), mouse x and y (int16).
+    """
+    MAGIC = "HBDI"
+    FORMAT_VERSION = 2
+    HEADER = struct.Struct("<4sHq")
+    FRAME = struct.Struct("<dHHHBBBhh")
+
+
+class InputRecorder:
+    """Writes the input of every tick to a log file"""
+    file = None
+
+    def __init__(self, path, seed):
+        self.file = open(path, "wb")
+        self.file.write(InputLog.HEADER.pack(InputLog.MAGIC,
+                                             InputLog.FORMAT_VERSION, seed))
+
+    def record(self, delta_time, state):
+        """Appends one tick of input"""
+        self.file.write(InputLog.FRAME.pack(delta_time, *state.pack()))
+
+    def close(self):
+        self.file.close()
+
+
+class InputPlayer:
+    """Reads a log written by InputRecorder back one tick at a time"""
+    seed = 0  # map seed the recording was made with
+    data = None  # the frames of the log
+    position = 0  # offset of the next frame in data
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(InputLog.HEADER.size)
+            self.data = f.read()
+        if len(header) != InputLog.HEADER.size:
+            raise ValueError("Not an input log: " + path)
+        magic, version, self.seed = InputLog.HEADER.unpack(header)
+        if magic != InputLog.MAGIC:
+            raise ValueError("Not an input log: " + path)
+        if version != InputLog.FORMAT_VERSION:
+            raise ValueError("Unsupported input log version %d" % version)
+
+    def play(self, state, camera=None):
+        """Loads the next tick of input into state and returns its delta
+           time, or None once the log has run out"""
+        if self.position + InputLog.FRAME.size > len(self.data):
+            return None
+        frame = InputLog.FRAME.unpack_from(self.data, self.position)
+        self.position += InputLog.FRAME.size
+        state.unpack(frame[1:], camera)
+        return frame[0]
@@ -1,5 +1,8 @@
 import pygame
 
+from Scene import Scene
+from Assets import assets
+
 class Inventory:
 
     SCREEN_WIDTH = 640
@@ -21,15 +24,28 @@ class Inventory:
         #item_img = pygame.image.load(self.item_list[]).convert()
         return self.invent_screen
 
-    def update(self):
-        key_pressed = pygame.key.get_pressed()
-
-        if key_pressed[pygame.K_i] and self.is_i_pressed == False:
-            self.is_i_pressed = True
-        elif key_pressed[pygame.K_i] and self.is_i_pressed == True:
-            self.is_i_pressed = False
-
     def render_invent(self, screen):
-        inventory_img = pygame.image.load("graphics/inventory_image.png").convert()
+        if self.inventory_img is None:
+            self.inventory_img = assets.load_image("graphics/inventory_image.png")
         if self.is_i_pressed == True:
-            screen.blit(inventory_img, (int(self.SCREEN_WIDTH / 6), int(self.SCREEN_HEIGHT / 5)))
+            screen.blit(self.inventory_img, (int(self.SCREEN_WIDTH / 6), int(self.SCREEN_HEIGHT / 5)))
+
+
+class InventoryScene(Scene):
+    """Shows the inventory over the game, which keeps running underneath"""
+    transparent = True
+    pauses_below = False
+
+    inventory = None
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+    def enter(self):
+        self.inventory.is_i_pressed = True
+
+    def exit(self):
+        self.inventory.is_i_pressed = False
+
+    def render(self, screen):
+        self.inventory.render_invent(screen)
@@ -0,0 +1,109 @@
+import numpy
+import pygame
+
+from Map import MAP
+from Assets import assets
+
+
+class Light:
+    """A light, usually given off by an object. Add it to lighting to
+    make it shine."""
+    radius = 0  # pixels from the centre to where the light fades out
+    colour = (255, 255, 255)  # brightness added at the centre
+    owner = None  # object carrying the light (None = fixed in place)
+    x = 0.0  # position in tiles, from the owner's position if it has one
+    y = 0.0
+
+    def __init__(self, radius, colour=(255, 255, 255), owner=None, x=0.0, y=0.0):
+        self.radius = radius
+        self.colour = colour
+        self.owner = owner
+        self.x = x
+        self.y = y
+
+    def position(self):
+        """Returns the centre of the light in tiles"""
+        if self.owner is None:
+            return self.x, self.y
+        return self.owner.x + self.x, self.owner.y + self.y
+
+
+class Lighting:
+    """Lights the scene from the registered lights.
+
+    Each frame a screen-sized light buffer is filled with the ambient
+    light, the lights on screen are added onto it, and the buffer is
+    multiplied over the scene. A light is a pre-rendered radial sprite,
+    made once per radius and colour and shared by every light like it.
+    Lights whose owner has despawned are dropped."""
+    AMBIENT = (55, 55, 55)  # light everywhere, without any lights
+    RADIUS_STEP = 10  # radii are rounded to this many pixels, so fewer sprites are made
+
+    lights = None  # lights shining
+    buffer = None  # screen-sized surface the light is added up in
+
+    def __init__(self):
+        self.lights = []
+
+    def add(self, light):
+        self.lights.append(light)
+
+    def remove(self, light):
+        if light in self.lights:
+            self.lights.remove(light)
+
+    @staticmethod
+    def sprite_key(radius, colour):
+        radius = max(Lighting.RADIUS_STEP,
+                     int(round(float(radius) / Lighting.RADIUS_STEP)) * Lighting.RADIUS_STEP)
+        return ("light", radius, tuple(colour))
+
+    @staticmethod
+    def prefetch(radius, colour):
+        """Starts making the sprite for a light in the background"""
+        key = Lighting.sprite_key(radius, colour)
+        assets.prefetch(key, Lighting.make_sprite, key[1], key[2])
+
+    @staticmethod
+    def sprite(radius, colour):
+        """Returns the shared sprite for a light, making it the first time"""
+        key = Lighting.sprite_key(radius, colour)
+        return assets.get(key, Lighting.make_sprite, key[1], key[2])
+
+    @staticmethod
+    def make_sprite(radius, colour):
+        """Draws a light fading linearly from colour at the centre to black
+        at radius"""
+        offsets = numpy.arange(2 * radius) - radius + 0.5
+        distance = numpy.sqrt(offsets[:, numpy.newaxis] ** 2 + offsets[numpy.newaxis, :] ** 2)
+        brightness = numpy.clip(1.0 - distance / radius, 0.0, 1.0)
+        pixels = brightness[:, :, numpy.newaxis] * numpy.array(colour, numpy.float64)
+        return pygame.surfarray.make_surface(pixels.astype(numpy.uint8))
+
+    def render(self, screen, camera):
+        """Lights everything drawn on screen so far"""
+        if self.buffer is None or self.buffer.get_size() != screen.get_size():
+            self.buffer = pygame.Surface(screen.get_size()).convert(screen)
+        self.buffer.fill(self.AMBIENT)
+
+        view = screen.get_rect()
+        shining = []
+        for light in self.lights:
+            if light.owner is not None and light.owner.despawning:
+                continue  # its owner has left the game
+            shining.append(light)
+
+            sprite = self.sprite(light.radius, light.colour)
+            x, y = light.position()
+            rect = sprite.get_rect(center=(int((x - camera.x) * MAP.TILE_SIZE),
+                                           int((y - camera.y) * MAP.TILE_SIZE)))
+            if rect.colliderect(view):
+                self.buffer.blit(sprite, rect, special_flags=pygame.BLEND_RGB_ADD)
+        if len(shining) != len(self.lights):
+            self.lights = shining
+
+        screen.blit(self.buffer, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+
+
+# Lights of the whole game
+lighting = Lighting()
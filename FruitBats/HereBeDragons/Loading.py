@@ -0,0 +1,178 @@
+import time
+import threading
+import multiprocessing
+import Queue
+
+import pygame
+
+from Map import MapClass, MAP
+from WorldCache import WorldCache
+from Scene import Scene
+
+
+def generate_world(seed, progress, results):
+    """Worker entry point: generates (and caches) a map and puts
+    (tiles, sea) on the results queue. progress is a shared value updated
+    from 0 to 1."""
+    def report(fraction):
+        progress.value = fraction
+
+    results.put(WorldCache().load_or_generate(seed, report))
+
+
+class WorldLoader:
+    """Generates a map in the background so the main thread can keep
+    drawing (e.g. the menu or a loading screen) in the meantime.
+
+    By default a separate process is used, so generation doesn't compete
+    with the main thread for the GIL; use_process=False uses a thread.
+    """
+    seed = 0
+    use_process = True
+    worker = None  # Process or Thread running generate_world
+    progress_value = None  # shared progress from 0 to 1
+    results = None  # queue the worker puts its result on
+    tiles = None  # generated tile array, once finished
+    sea = None  # generated sea array, once finished
+
+    def __init__(self, seed=0, use_process=True):
+        self.seed = seed
+        self.use_process = use_process
+
+    def start(self):
+        """Starts generating the map in the background, unless it's
+           already in the world cache"""
+        if self.seed != 0:
+            cached = WorldCache().load(self.seed)
+            if cached is not None:
+                self.tiles, self.sea = cached
+                return
+        self.progress_value = multiprocessing.Value('d', 0.0)
+        if self.use_process:
+            self.results = multiprocessing.Queue()
+            self.worker = multiprocessing.Process(
+                target=generate_world,
+                args=(self.seed, self.progress_value, self.results))
+        else:
+            self.results = Queue.Queue()
+            self.worker = threading.Thread(
+                target=generate_world,
+                args=(self.seed, self.progress_value, self.results))
+        self.worker.daemon = True
+        self.worker.start()
+
+    def progress(self):
+        """Returns how far through generation the worker is, from 0 to 1"""
+        if self.tiles is not None:
+            return 1.0
+        if self.progress_value is None:
+            return 0.0
+        return self.progress_value.value
+
+    def done(self, timeout=0):
+        """Returns True once the generated arrays have been received,
+           waiting up to timeout seconds for them"""
+        if self.tiles is None and self.worker is not None:
+            try:
+                if timeout > 0:
+                    self.tiles, self.sea = self.results.get(True, timeout)
+                else:
+                    self.tiles, self.sea = self.results.get_nowait()
+            except Queue.Empty:
+                if self.worker.is_alive():
+                    return False
+                try:
+                    # The worker may have finished since the check above
+                    self.tiles, self.sea = self.results.get_nowait()
+                except Queue.Empty:
+                    raise RuntimeError("Map generation worker stopped "
+                                       "without a result")
+            self.worker.join()
+            self.worker = None
+        return self.tiles is not None
+
+    def create_map(self):
+        """Returns an unrendered MapClass built from the generated arrays"""
+        if self.worker is None and self.tiles is None:
+            self.start()  # never started, so load or generate now
+        while not self.done(0.1):
+            pass
+        return MapClass(tiles=self.tiles, sea=self.sea, render=False)
+
+
+class LoadingScreen:
+    """Draws the progress bar LoadingScene shows while a WorldLoader
+    finishes and the map surface is built a few rows per frame"""
+    BACKGROUND_COLOUR = (0, 0, 0)
+    BAR_COLOUR = (0, 255, 0)
+    BAR_WIDTH = 400
+    BAR_HEIGHT = 20
+    ROWS_PER_FRAME = 4  # map rows rendered between screen updates
+
+    screen = None
+    font = None
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.font = pygame.font.Font(None, 30)
+
+    def draw_bar(self, progress, message):
+        """Draws the loading message and bar without updating the display"""
+        width, height = self.screen.get_size()
+        bar = pygame.Rect((width - self.BAR_WIDTH) / 2, height / 2,
+                          self.BAR_WIDTH, self.BAR_HEIGHT)
+
+        self.screen.fill(self.BACKGROUND_COLOUR)
+        label = self.font.render(message, 1, self.BAR_COLOUR)
+        self.screen.blit(label, ((width - label.get_width()) / 2,
+                                 bar.top - label.get_height() - 10))
+        pygame.draw.rect(self.screen, self.BAR_COLOUR, bar, 1)
+        bar.width = int(self.BAR_WIDTH * progress)
+        pygame.draw.rect(self.screen, self.BAR_COLOUR, bar)
+
+
+class LoadingScene(Scene):
+    """LoadingScreen as a scene: waits for a WorldLoader, renders the map
+    ROWS_PER_FRAME rows a frame, then hands the finished map to
+    on_loaded (which should switch to the next scene)."""
+    frame_rate = 30  # while waiting on the worker; unlimited once building
+
+    loader = None  # WorldLoader
+    on_loaded = None  # function taking the finished MapClass
+    screen = None  # LoadingScreen drawing the bar
+    map = None  # map being rendered, once generated
+    next_row = 0  # next map row to render
+    progress = 0.0
+    message = "Generating world..."
+    start_time = 0  # time.time() when the scene was entered
+
+    def __init__(self, loader, on_loaded):
+        self.loader = loader
+        self.on_loaded = on_loaded
+
+    def enter(self):
+        self.start_time = time.time()
+        self.screen = LoadingScreen(self.manager.screen)
+        if self.loader.worker is None and self.loader.tiles is None:
+            self.loader.start()
+
+    def update(self, delta_time, events):
+        if self.map is None:
+            # First half of the bar: generation in the worker
+            if not self.loader.done():
+                self.progress = 0.5 * self.loader.progress()
+                return
+            self.map = self.loader.create_map()
+            self.message = "Building world..."
+            self.frame_rate = 0
+
+        # Second half: building the map surface on the main thread
+        rows = LoadingScreen.ROWS_PER_FRAME
+        self.map.render_rows(self.next_row, self.next_row + rows)
+        self.next_row = min(self.next_row + rows, MAP.SIZE_Y)
+        self.progress = 0.5 + 0.5 * self.next_row / MAP.SIZE_Y
+        if self.next_row >= MAP.SIZE_Y:
+            self.on_loaded(self.map)
+
+    def render(self, screen):
+        self.screen.draw_bar(self.progress, self.message)
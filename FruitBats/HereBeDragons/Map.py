@@ -1,11 +1,21 @@
+import numpy
 import pygame
-import random
+
+from Autotile import CoastTileset, coast_mask, coast_masks
+from Assets import assets
 
 class MAP:
     SEA_CHANCE = 20  # Larger number, lower sea chance
     TILE_SIZE = 80  # size of game tiles in pixels
     SIZE_Y = 60
     SIZE_X = 60
+    CHUNK_SIZE = 10  # size of map chunks (pathfinding clusters) in tiles
+    BLOCKED_TILES = [-2]  # tile values that can't be walked over (sea)
+    GENERATOR = "random"  # "random" (per tile) or "noise" (better for large maps)
+    NOISE_BIOME_SCALE = 12.0  # rough size of ground patches in tiles (noise generator)
+    NOISE_SEA_SCALE = 30.0  # rough size of seas in tiles (noise generator)
+    NOISE_SEA_FRACTION = 0.15  # share of the map that is sea (noise generator)
+    NOISE_SAND_FRACTION = 0.05  # share of the map that is beach (noise generator)
     TILE_INFO = [  # INFORMATION ON TILES (SPAWN WEIGHT, FILE NAME)
         [20, "ImageFiles/Ground/temp_grass.jpg"],
         [3, "ImageFiles/Ground/temp_mountain.jpg"],
@@ -20,126 +30,84 @@ class MAP:
 
 class MapClass:
     """Fully extendible mapclass, image size and spawn weights can be edited"""
-    map = [[0 for x in range(0, MAP.SIZE_X)] for y in range(0, MAP.SIZE_Y)]  # Generates a 2d array for Map size
-    sea = [[False for x in range(0, MAP.SIZE_X)] for y in range(0, MAP.SIZE_Y)]
-    img = pygame.Surface((MAP.SIZE_X, MAP.SIZE_Y))
+    map = None  # tile values, indexed [x][y]
+    sea = None  # generator's river cells the tiles were classified from, indexed [x][y]
+    img = None  # Surface the map is rendered into
 
-    def __init__(self, seed=0):
-        """Initilizes Map class with a seed"""
-        if not (seed == 0):
-            random.seed(seed)
-        total_weight = 0
-        for i in MAP.TILE_INFO:
-            total_weight += i[0]  # Gets the total weight if everything in MAP.TILE_INFO
-        for y in range(0, MAP.SIZE_Y):
-            for x in range(0, MAP.SIZE_X):
-                rand = random.randint(0, total_weight)
-                ndone = True
-                for i in range(0, len(MAP.TILE_INFO)):  # Turns random number into Map tile
-                    rand -= MAP.TILE_INFO[i][0]
-                    if rand <= 0 and ndone:
-                        ndone = False
-                        self.map[x][y] = i
-        self.map_render()
-        self.create_sea()
-        self.img = self.sea_render()
+    def __init__(self, seed=0, tiles=None, sea=None, render=True):
+        """Initilizes Map class with a seed, or with pre-generated tile and
+        sea arrays (see MapGenerator). Seeded maps are loaded from the
+        world cache when possible. If render is False the surface is
+        left blank to be filled in with render_rows()"""
+        if tiles is None:
+            from WorldCache import WorldCache
+            tiles, sea = WorldCache().load_or_generate(seed)
+        self.map = tiles
+        self.sea = sea
+        self.coast = coast_masks(self.map)  # sand variant for every tile
+        self.tile_images = dict()
+        self.listeners = []  # functions called with (x, y) when a tile changes
+        self.snapshot_taken = False  # arrays are shared with a snapshot
+        self.img = pygame.Surface((MAP.SIZE_X * MAP.TILE_SIZE, MAP.SIZE_Y * MAP.TILE_SIZE))
+        if render:
+            self.map_render()
+
+    def tile_image(self, tile):
+        """Returns the image for a tile value, loading it the first time"""
+        if tile not in self.tile_images:
+            if tile == -2:
+                filename = MAP.SEA_TILE[1][0]  # Sea
+            else:
+                filename = MAP.TILE_INFO[tile][1]
+            self.tile_images[tile] = assets.load_image(filename)
+        return self.tile_images[tile]
 
     def map_render(self):
         """Renders map array into img surface"""
-        ret = pygame.Surface((MAP.SIZE_X * MAP.TILE_SIZE, MAP.SIZE_Y * MAP.TILE_SIZE))
-        for y in range(0, MAP.SIZE_Y):
-            for x in range(0, MAP.SIZE_X):
-                temp_img = pygame.image.load(MAP.TILE_INFO[self.map[x][y]][1]).convert()
-                ret.blit(temp_img, (x * MAP.TILE_SIZE, y * MAP.TILE_SIZE))
-        self.img = ret
-
-    def create_sea(self):
-        """Checks each on x,1 and 1,y to see if a sea starts, 1 is used as the array has a boarder"""
-        for y in range(0, MAP.SIZE_Y):  # Spawns sea starts on the y axis
-            number = random.randint(0, MAP.SEA_CHANCE)  # Generate random number to see if sea spawns
-            if number == 0:  # If number is 0 change array position to True and run sea_flow_y
-                self.sea[0][y] = True
-                MapClass.sea_flow_y(self, y)
-        for x in range(0, MAP.SIZE_X):  # Spawns sea starts on the x axis
-            number = random.randint(0, MAP.SEA_CHANCE)
-            if number == 0:  # If number is 0 change array position to True and run sea_flow_x
-                self.sea[x][0] = True
-                MapClass.sea_flow_x(self, x)
-
-    def sea_flow_y(self, y):
-        """Loops placing True in the array until hitting the edge of array,
-        randomly picks the direction starting on y axis"""
-        x = 0
-        while not x >= MAP.SIZE_X-1 and not x < 0 and not y >= MAP.SIZE_Y-1 and not y < 0:
-            # While not past the array boundary's
-            which_tile = random.randint(0, 3)  # Random int used to pick which direction
-            if which_tile == 0:
-                if not y == 0:  # Don't check if at top of map
-                    y -= 1
-                    self.sea[x][y] = True  # Up
-            if which_tile == 1:
-                if not y == MAP.SIZE_Y-1:  # Don't check if at bottom of map
-                    y += 1
-                    self.sea[x][y] = True  # Down
-            if which_tile >= 2:
-                if not x == MAP.SIZE_X-1:  # Don't check if at right side of map
-                    x += 1
-                    self.sea[x][y] = True  # Right
-
-    def sea_flow_x(self, x):
-        """Loops placing True in the array until hitting the edge of array,
-        randomly picks the direction starting on x axis"""
-        y = 0
-        while not y >= MAP.SIZE_Y-1 and not y < 0 and not x >= MAP.SIZE_X-1 and not x < 0:
-            # While not past the array boundary's
-            which_tile = random.randint(0, 3)  # Random int used to pick which direction
-            if which_tile == 0:
-                if not x == 0:  # Don't check if at left side of map
-                    x -= 1
-                    self.sea[x][y] = True  # Left
-            if which_tile == 1:
-                if not x == MAP.SIZE_X-1:  # Don't check if at right side of map'
-                    x += 1
-                    self.sea[x][y] = True  # Right
-            if which_tile >= 2:
-                if not y == MAP.SIZE_Y-1:  # Don't check if at bottom of map
-                    y += 1
-                    self.sea[x][y] = True  # Down
+        self.render_rows(0, MAP.SIZE_Y)
 
-    def sea_render(self):
-        """Blits sea images depending on what other places adjacent are seas and sand to some of the edges"""
-        surf = self.img
-        for y in range(0, MAP.SIZE_Y):
+    def render_rows(self, first_row, last_row):
+        """Renders the map rows first_row to last_row (exclusive) into the
+        img surface, so a large map can be drawn over several frames"""
+        for y in range(first_row, min(last_row, MAP.SIZE_Y)):
             for x in range(0, MAP.SIZE_X):
-                adj = MapClass.sea_check(self, x, y)  # Runs function to check whats next to current tile
-                if x <= MAP.SIZE_X and y <= MAP.SIZE_Y:
-                    if adj == 1 or adj == 10 or adj == 100 or adj == 1000:  # If at the edge of the sea
-                        self.map[x][y] = -1  # Changes map array at location for sand
-                        temp_sea = pygame.image.load(MAP.SEA_TILE[0][0]).convert()  # Get sand
-                        surf.blit(temp_sea, ((x * MAP.TILE_SIZE), (y * MAP.TILE_SIZE)))
-                    elif adj != 0 and adj != 1 and adj != 10 and adj != 100 and adj != 1000:  # If multiple sea connections
-                        self.map[x][y] = -2  # Changes map array at location for sea
-                        temp_sea = pygame.image.load(MAP.SEA_TILE[1][0]).convert()  # Get sea
-                        surf.blit(temp_sea, ((x * MAP.TILE_SIZE), (y * MAP.TILE_SIZE)))
+                self.render_tile(x, y)
 
-        return surf  # Return edited image
+    def render_tile(self, x, y):
+        """Draws a single tile into the img surface; sand is drawn with the
+        tileset variant matching the sea around it"""
+        position = (x * MAP.TILE_SIZE, y * MAP.TILE_SIZE)
+        if self.map[x][y] == -1:
+            tileset = CoastTileset.get(MAP.SEA_TILE[0][0], MAP.SEA_TILE[1][0],
+                                       MAP.TILE_SIZE)
+            self.img.blit(tileset.surface, position,
+                          tileset.area(self.coast[x][y]))
+        else:
+            self.img.blit(self.tile_image(self.map[x][y]), position)
 
-    def sea_check(self, x, y):
-        """Checks adjacent tiles for seas"""
-        num_adj = 0  # Variable to return
-        if not x == 0:
-            if self.sea[x - 1][y]:  # Check left
-                num_adj += 1
-        if not y == MAP.SIZE_Y - 1:
-            if self.sea[x][y + 1]:  # Check up
-                num_adj += 10
-        if not y == 0:
-            if self.sea[x][y - 1]:  # Check down
-                num_adj += 100
-        if not x == MAP.SIZE_X - 1:
-            if self.sea[x + 1][y]:  # Check right
-                num_adj += 1000
-        return num_adj
+    def set_tile(self, x, y, tile):
+        """Changes the tile at x, y (a MAP.TILE_INFO index, -1 for sand or
+        -2 for sea). Only the tile and its neighbours are redrawn, and
+        listeners are told about the change. The sea array is left as
+        generated, so the classification of the tiles around it stands."""
+        if self.snapshot_taken:
+            # Copy on write, leaving the snapshot's array untouched
+            self.map = numpy.array(self.map)
+            self.snapshot_taken = False
+        self.map[x][y] = tile
 
+        # The tile and its neighbours may need a different sand variant
+        for tile_x, tile_y in ((x, y), (x, y - 1), (x + 1, y),
+                               (x, y + 1), (x - 1, y)):
+            if 0 <= tile_x < MAP.SIZE_X and 0 <= tile_y < MAP.SIZE_Y:
+                self.coast[tile_x][tile_y] = coast_mask(self.map, tile_x, tile_y)
+                self.render_tile(tile_x, tile_y)
 
+        for listener in self.listeners:
+            listener(x, y)
 
+    def snapshot(self):
+        """Returns the tile and sea arrays without copying them; the tiles
+        are copied before the next set_tile() so the snapshot never changes"""
+        self.snapshot_taken = True
+        return self.map, self.sea
@@ -0,0 +1,234 @@
+import random
+
+import numpy
+
+from Map import MAP
+from Noise import fractal_noise
+
+
+class MapGenerator:
+    """Generates the tile and sea grids for a map without touching PyGame,
+    so it can run in a worker thread or process.
+
+    The result is a pair of compact NumPy arrays indexed [x][y]:
+    tiles (int8, MAP.TILE_INFO index, -1 for sand, -2 for sea) and
+    sea (bool, the raw river cells).
+
+    Each generator has its own random number generator, so the same seed
+    always gives the same map no matter what else uses the random module.
+    """
+    NAME = "random"  # generator name used by MAP.GENERATOR and the world cache
+    RIVER_STEPS = 1 << 20  # most river steps drawn at once (see flow_rivers)
+    VERSION = 2  # increase whenever a change alters the maps a seed produces
+
+    seed = 0  # seed actually used (a random one is picked for seed 0)
+    rng = None  # random.Random used by every generation pass
+    map = None  # tile indices while generating
+    sea = None  # river cells while generating
+    progress = None  # optional function called with progress from 0 to 1
+
+    def __init__(self, seed=0, progress=None):
+        """Initilizes generator with a seed (0 = pick a random seed)"""
+        if seed == 0:
+            seed = random.SystemRandom().randint(1, 2 ** 31 - 1)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.progress = progress
+
+    def report(self, fraction):
+        """Passes generation progress on to the progress function"""
+        if self.progress is not None:
+            self.progress(fraction)
+
+    def generate(self):
+        """Runs every generation pass and returns (tiles, sea) arrays"""
+        self.map = [[0 for y in range(0, MAP.SIZE_Y)] for x in range(0, MAP.SIZE_X)]
+        self.create_tiles()
+        self.map = numpy.array(self.map, dtype=numpy.int8)
+
+        self.sea = numpy.zeros((MAP.SIZE_X, MAP.SIZE_Y), dtype=numpy.bool_)
+        self.create_sea()
+        self.report(0.9)
+        self.classify_sea()
+        self.report(1.0)
+
+        return self.map, self.sea
+
+    def create_tiles(self):
+        """Picks a weighted random MAP.TILE_INFO index for every tile"""
+        total_weight = 0
+        for i in MAP.TILE_INFO:
+            total_weight += i[0]  # Gets the total weight if everything in MAP.TILE_INFO
+        for y in range(0, MAP.SIZE_Y):
+            for x in range(0, MAP.SIZE_X):
+                rand = self.rng.randint(0, total_weight)
+                ndone = True
+                for i in range(0, len(MAP.TILE_INFO)):  # Turns random number into Map tile
+                    rand -= MAP.TILE_INFO[i][0]
+                    if rand <= 0 and ndone:
+                        ndone = False
+                        self.map[x][y] = i
+            self.report(0.8 * (y + 1) / MAP.SIZE_Y)
+
+    def create_sea(self):
+        """Starts rivers on the left and top edges (1 in MAP.SEA_CHANCE + 1
+        chance per edge tile) and flows them across the map"""
+        rng = numpy.random.RandomState(self.seed & 0xffffffff)
+        starts_y = numpy.nonzero(
+            rng.randint(0, MAP.SEA_CHANCE + 1, MAP.SIZE_Y) == 0)[0]
+        starts_x = numpy.nonzero(
+            rng.randint(0, MAP.SEA_CHANCE + 1, MAP.SIZE_X) == 0)[0]
+
+        # Rivers from the left edge flow right, wandering up and down
+        for x, y in self.flow_rivers(rng, starts_y, MAP.SIZE_X, MAP.SIZE_Y):
+            self.sea[x, y] = True
+        # Rivers from the top edge flow down, wandering left and right
+        for y, x in self.flow_rivers(rng, starts_x, MAP.SIZE_Y, MAP.SIZE_X):
+            self.sea[x, y] = True
+
+    def flow_rivers(self, rng, starts, forward_size, side_size):
+        """Random walks for a batch of rivers at once. Each river starts at
+        forward position 0 and side position starts[i]; every step it moves
+        forward (1 in 2), or one to either side (1 in 4 each), until it
+        reaches the far edge or the bottom/right side edge.
+
+        Steps are drawn a block of rivers at a time and turned into
+        positions with cumulative sums, so no Python code runs per step and
+        memory stays at about RIVER_STEPS steps however big the map is.
+        Yields the (forward, side) coordinates of the tiles each block of
+        rivers covers."""
+        # Crossing takes ~2 * forward_size steps; this is comfortably more
+        max_steps = 4 * (forward_size + side_size)
+        block_size = max(1, self.RIVER_STEPS / max_steps)
+        for first in xrange(0, len(starts), block_size):
+            block_starts = starts[first:first + block_size].astype(numpy.int32)
+            # (Drawn as int64 like one big draw would be, so a seed's
+            # rivers don't depend on the block size)
+            steps = rng.randint(0, 4, (len(block_starts), max_steps)).astype(numpy.int8)
+            forward = numpy.cumsum(steps >= 2, axis=1, dtype=numpy.int32)
+            side = numpy.cumsum((steps == 1).astype(numpy.int8) - (steps == 0),
+                                axis=1, dtype=numpy.int32)
+            del steps
+            side += block_starts[:, numpy.newaxis]
+            numpy.clip(side, 0, side_size - 1, out=side)
+            numpy.minimum(forward, forward_size - 1, out=forward)
+
+            # Cut each river off at the first step touching a far edge
+            finished = (forward >= forward_size - 1) | (side >= side_size - 1)
+            last_step = numpy.where(finished.any(axis=1),
+                                    finished.argmax(axis=1), max_steps - 1)
+            del finished
+            covered = numpy.arange(max_steps) <= last_step[:, numpy.newaxis]
+
+            # Include the start tiles, which lie before the first step
+            yield (numpy.concatenate((numpy.zeros(len(block_starts), numpy.int32),
+                                      forward[covered])),
+                   numpy.concatenate((block_starts, side[covered])))
+
+    def classify_sea(self):
+        """Turns tiles next to the sea into sand (-1) or sea (-2) depending on
+        how many adjacent places are seas"""
+        sea = self.sea.astype(numpy.int8)
+        adjacent = numpy.zeros(sea.shape, numpy.int8)
+        adjacent[1:, :] += sea[:-1, :]  # Check left
+        adjacent[:-1, :] += sea[1:, :]  # Check right
+        adjacent[:, 1:] += sea[:, :-1]  # Check up
+        adjacent[:, :-1] += sea[:, 1:]  # Check down
+        self.map[adjacent == 1] = -1  # If at the edge of the sea, sand
+        self.map[adjacent > 1] = -2  # If multiple sea connections, sea
+
+
+class NoiseMapGenerator(MapGenerator):
+    """Generates terrain from coherent value noise instead of picking each
+    tile independently, giving larger patches of each ground type and
+    smooth coastlines.
+
+    Every tile only depends on its own coordinates and the seed, so any
+    chunk can be generated on its own with generate_chunk(), e.g. lazily
+    as the player explores a large or endless world. Biome and sea
+    thresholds are measured once from a fixed sample of the noise, which
+    keeps the MAP.TILE_INFO weights as the share of each ground type.
+    """
+    NAME = "noise"
+    VERSION = 1
+
+    SAMPLE_SIZE = 64  # sample points per axis used to measure thresholds
+    SAMPLE_SPACING = 7  # tiles between sample points
+
+    tile_thresholds = None  # biome noise values splitting MAP.TILE_INFO
+    sea_level = 0.0  # sea noise below this is sea
+    sand_level = 0.0  # sea noise below this (and above sea_level) is sand
+
+    def __init__(self, seed=0, progress=None):
+        MapGenerator.__init__(self, seed, progress)
+
+        # Measure the noise distributions on a fixed sample area
+        sample = numpy.arange(self.SAMPLE_SIZE) * self.SAMPLE_SPACING
+        xs, ys = numpy.meshgrid(sample, sample)
+        biome = self.biome_noise(xs, ys)
+        sea = self.sea_noise(xs, ys)
+
+        total_weight = float(sum(tile[0] for tile in MAP.TILE_INFO))
+        cumulative = numpy.cumsum([tile[0] for tile in MAP.TILE_INFO])[:-1]
+        self.tile_thresholds = numpy.percentile(
+            biome, 100 * cumulative / total_weight)
+        self.sea_level = numpy.percentile(sea, 100 * MAP.NOISE_SEA_FRACTION)
+        self.sand_level = numpy.percentile(
+            sea, 100 * (MAP.NOISE_SEA_FRACTION + MAP.NOISE_SAND_FRACTION))
+
+    def biome_noise(self, xs, ys):
+        """Noise field used to choose the ground type"""
+        return fractal_noise(self.seed, xs, ys, MAP.NOISE_BIOME_SCALE)
+
+    def sea_noise(self, xs, ys):
+        """Noise field used to place the sea and coastline"""
+        return fractal_noise(self.seed + 1, xs, ys, MAP.NOISE_SEA_SCALE)
+
+    def generate_area(self, left, top, width, height):
+        """Returns (tiles, sea) arrays indexed [x][y] for any area of the
+           world, including areas outside the MAP.SIZE_X/SIZE_Y map"""
+        xs, ys = numpy.meshgrid(numpy.arange(left, left + width),
+                                numpy.arange(top, top + height),
+                                indexing="ij")
+        tiles = numpy.searchsorted(self.tile_thresholds,
+                                   self.biome_noise(xs, ys)).astype(numpy.int8)
+        coast = self.sea_noise(xs, ys)
+        sea = coast < self.sea_level
+        tiles[coast < self.sand_level] = -1
+        tiles[sea] = -2
+        return tiles, sea
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        """Returns (tiles, sea) arrays for one MAP.CHUNK_SIZE square chunk"""
+        return self.generate_area(chunk_x * MAP.CHUNK_SIZE,
+                                  chunk_y * MAP.CHUNK_SIZE,
+                                  MAP.CHUNK_SIZE, MAP.CHUNK_SIZE)
+
+    def generate(self):
+        """Generates the whole map chunk by chunk"""
+        tiles = numpy.zeros((MAP.SIZE_X, MAP.SIZE_Y), dtype=numpy.int8)
+        sea = numpy.zeros((MAP.SIZE_X, MAP.SIZE_Y), dtype=numpy.bool_)
+        chunks_x = (MAP.SIZE_X + MAP.CHUNK_SIZE - 1) / MAP.CHUNK_SIZE
+        chunks_y = (MAP.SIZE_Y + MAP.CHUNK_SIZE - 1) / MAP.CHUNK_SIZE
+        for chunk_y in range(chunks_y):
+            for chunk_x in range(chunks_x):
+                left = chunk_x * MAP.CHUNK_SIZE
+                top = chunk_y * MAP.CHUNK_SIZE
+                chunk_tiles, chunk_sea = self.generate_chunk(chunk_x, chunk_y)
+                width = min(MAP.CHUNK_SIZE, MAP.SIZE_X - left)
+                height = min(MAP.CHUNK_SIZE, MAP.SIZE_Y - top)
+                tiles[left:left + width, top:top + height] = \
+                    chunk_tiles[:width, :height]
+                sea[left:left + width, top:top + height] = \
+                    chunk_sea[:width, :height]
+            self.report(float(chunk_y + 1) / chunks_y)
+        return tiles, sea
+
+
+GENERATORS = {MapGenerator.NAME: MapGenerator,
+              NoiseMapGenerator.NAME: NoiseMapGenerator}
+
+
+def create_generator(seed=0, progress=None):
+    """Returns the generator picked by MAP.GENERATOR"""
+    return GENERATORS[MAP.GENERATOR](seed, progress)
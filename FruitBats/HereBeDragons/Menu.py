@@ -1,6 +1,8 @@
 import sys
 import pygame
 
+from Scene import Scene
+
 WHITE = (255, 255, 255)
 GREEN = (0, 255, 0)
 
@@ -12,9 +14,19 @@ class MenuItem(pygame.font.Font):
         self.text = text
         self.font_size = font_size
         self.font_color = font_color
-        self.label = self.render(self.text, 1, self.font_color)
-        self.width = self.label.get_rect().width
-        self.height = self.label.get_rect().height
+        self.highlighted = False
+
+        # Render both looks once up front rather than whenever they change
+        self.normal_label = self.render(self.text, 1, self.font_color)
+        self.set_italic(True)
+        self.highlighted_label = self.render(self.text, 1, GREEN)
+        self.set_italic(False)
+        self.label = self.normal_label
+
+        self.width = max(self.normal_label.get_width(),
+                         self.highlighted_label.get_width())
+        self.height = max(self.normal_label.get_height(),
+                          self.highlighted_label.get_height())
         self.dimensions = (self.width, self.height)
         self.pos_x = pos_x
         self.pos_y = pos_y
@@ -31,15 +43,25 @@ class MenuItem(pygame.font.Font):
         self.pos_x = x
         self.pos_y = y
 
-    def set_font_color(self, rgb_tuple):
-        self.font_color = rgb_tuple
-        self.label = self.render(self.text, 1, self.font_color)
+    def set_highlighted(self, highlighted):
+        """Switches between the normal and highlighted label. Returns True
+           if that changed anything."""
+        if highlighted == self.highlighted:
+            return False
+        self.highlighted = highlighted
+        if highlighted:
+            self.label = self.highlighted_label
+        else:
+            self.label = self.normal_label
+        return True
 
 
 class GameMenu:
 
     running = True
     background_image = None
+    SCROLL_MARGIN = 60  # pixels kept clear above and below the item list
+    ITEM_SPACING = 2  # pixels between items
 
     def __init__(self, screen, font=None,
                  font_size=30, font_color=WHITE):
@@ -52,24 +74,23 @@ class GameMenu:
         self.background_image = pygame.transform.scale(self.background_image,
                                                        (self.scr_width, self.scr_height))
 
-        self.clock = pygame.time.Clock()
         self.funcs = {"New Game": GameMenu.start_pressed,
                       "Quit": GameMenu.quit_pressed}
         self.items = []
-        key_list = self.funcs.keys()
-        for index, item in enumerate(key_list):
-            menu_item = MenuItem(item, font, font_size, font_color)
-
-            # total height of text block
-            total_height = len(key_list) * menu_item.height
-            pos_x = (self.scr_width / 2) - (menu_item.width / 2)
-            pos_y = (self.scr_height / 2) - (total_height / 2) + ((index * 2) + index * menu_item.height)
+        for item in self.funcs.keys():
+            self.items.append(MenuItem(item, font, font_size, font_color))
 
-            menu_item.set_position(pos_x, pos_y)
-            self.items.append(menu_item)
+        # Show as many items as fit; the rest are reached by scrolling
+        item_height = self.items[0].height + self.ITEM_SPACING
+        self.max_visible = max(1, (self.scr_height - 2 * self.SCROLL_MARGIN)
+                               / item_height)
+        self.scroll = 0  # index of the first item shown
+        self.layout_items()
 
         self.mouse_is_visible = True
         self.cur_item = None
+        self.hover_item = None
+        self.dirty = True  # whether the screen needs redrawing
 
     def start_pressed(self):
         self.running = False
@@ -77,21 +98,53 @@ class GameMenu:
     def quit_pressed(self):
         sys.exit()
 
+    def visible_items(self):
+        """Returns the items currently scrolled into view"""
+        return self.items[self.scroll:self.scroll + self.max_visible]
+
+    def layout_items(self):
+        """Centres the visible items on the screen"""
+        visible = self.visible_items()
+        total_height = sum(item.height + self.ITEM_SPACING for item in visible)
+        pos_y = (self.scr_height / 2) - (total_height / 2)
+        for item in visible:
+            item.set_position((self.scr_width / 2) - (item.width / 2), pos_y)
+            pos_y += item.height + self.ITEM_SPACING
+        self.dirty = True
+
+    def scroll_to(self, index):
+        """Scrolls the list so the item at index is visible"""
+        scroll = self.scroll
+        if index < scroll:
+            scroll = index
+        elif index >= scroll + self.max_visible:
+            scroll = index - self.max_visible + 1
+        self.scroll_by(scroll - self.scroll)
+
+    def scroll_by(self, amount):
+        """Scrolls the list by amount items, within its bounds"""
+        scroll = min(max(self.scroll + amount, 0),
+                     max(len(self.items) - self.max_visible, 0))
+        if scroll != self.scroll:
+            self.scroll = scroll
+            self.layout_items()
+
     def set_mouse_visibility(self):
         if self.mouse_is_visible:
             pygame.mouse.set_visible(True)
         else:
             pygame.mouse.set_visible(False)
 
+    def highlight(self, index):
+        """Highlights the item at index (None for no item)"""
+        for item_index, item in enumerate(self.items):
+            if item.set_highlighted(item_index == index):
+                self.dirty = True
+
     def set_item_selection(self, key):
         """
         Marks the MenuItem chosen via up and down keys
         """
-        for item in self.items:
-            # Return all to neutral
-            item.set_italic(False)
-            item.set_font_color(WHITE)
-
         if self.cur_item is None:
             self.cur_item = 0
         else:
@@ -109,8 +162,8 @@ class GameMenu:
                     self.cur_item == len(self.items) - 1:
                 self.cur_item = 0
 
-        self.items[self.cur_item].set_italic(True)
-        self.items[self.cur_item].set_font_color(GREEN)
+        self.scroll_to(self.cur_item)
+        self.highlight(self.cur_item)
 
         # Finally check if Enter os Space is pressed
         if key == pygame.K_ESCAPE or \
@@ -118,48 +171,82 @@ class GameMenu:
             text = self.items[self.cur_item].text
             self.funcs[text](self)
 
-    def set_mouse_selection(self, item, mpos):
+    def item_at(self, mpos):
+        """Returns the index of the visible item under mpos, or None"""
+        for index, item in enumerate(self.visible_items()):
+            if item.is_mouse_selection(mpos):
+                return self.scroll + index
+        return None
+
+    def set_mouse_selection(self, mpos):
         """
         Marks the MenuItem the mouse cursor hovers on.
         """
-        if item.is_mouse_selection(mpos):
-            item.set_font_color(GREEN)
-            item.set_italic(True)
-        else:
-            item.set_font_color(WHITE)
-            item.set_italic(False)
-
-    def run(self):
-        self.running = True
-        while self.running:
-            # Limit frame speed to 50 FPS
-            self.clock.tick(50)
-
-            mpos = pygame.mouse.get_pos()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    self.mouse_is_visible = False
-                    self.set_item_selection(event.key)
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    for item in self.items:
-                        if item.is_mouse_selection(mpos):
-                            self.funcs[item.text](self)
-
-            if pygame.mouse.get_rel() != (0, 0):
+        self.hover_item = self.item_at(mpos)
+        self.highlight(self.hover_item)
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            sys.exit()
+        if event.type == pygame.KEYDOWN:
+            if self.mouse_is_visible:
+                self.mouse_is_visible = False
+                self.set_mouse_visibility()
+            self.set_item_selection(event.key)
+        if event.type == pygame.MOUSEMOTION:
+            if not self.mouse_is_visible:
                 self.mouse_is_visible = True
-                self.cur_item = None
-
-            self.set_mouse_visibility()
-
-            # Redraw the background
-            self.screen.blit(self.background_image, [0, 0])
-
-            for item in self.items:
-                if self.mouse_is_visible:
-                    self.set_mouse_selection(item, mpos)
-                self.screen.blit(item.label, item.position)
-
-            pygame.display.flip()
+                self.set_mouse_visibility()
+            self.cur_item = None
+            self.set_mouse_selection(event.pos)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 4:  # wheel up
+                self.scroll_by(-1)
+                self.set_mouse_selection(event.pos)
+            elif event.button == 5:  # wheel down
+                self.scroll_by(1)
+                self.set_mouse_selection(event.pos)
+            else:
+                index = self.item_at(event.pos)
+                if index is not None:
+                    self.funcs[self.items[index].text](self)
+
+    def draw(self):
+        """Redraws the background and the visible items"""
+        self.screen.blit(self.background_image, [0, 0])
+        for item in self.visible_items():
+            self.screen.blit(item.label, item.position)
+        self.dirty = False
+
+
+class MenuScene(Scene):
+    """The main menu as a scene. Starts preloading next_scene as soon as
+    it's shown and switches to it when New Game is chosen."""
+    next_scene = None
+    menu = None  # GameMenu
+
+    def __init__(self, next_scene):
+        self.next_scene = next_scene
+
+    def enter(self):
+        self.menu = GameMenu(self.manager.screen)
+        self.menu.set_mouse_visibility()
+        self.menu.set_mouse_selection(pygame.mouse.get_pos())
+        self.manager.preload(self.next_scene)
+
+    def exit(self):
+        pygame.mouse.set_visible(True)
+
+    def wants_frames(self):
+        return self.menu.dirty
+
+    def update(self, delta_time, events):
+        for event in events:
+            self.menu.handle_event(event)
+            if not self.menu.running:
+                self.manager.replace(self.next_scene)
+                return
+
+    def render(self, screen):
+        if self.menu.dirty:
+            self.menu.draw()
@@ -0,0 +1,130 @@
+import numpy
+import pygame
+
+from Map import MAP
+from Assets import assets
+
+
+class Minimap:
+    """HUD map of the world in the corner of the screen, showing only
+    the explored ground.
+
+    The terrain is made from the map's tile array as one pixel per tile,
+    scaled to the minimap's size once and kept; tiles changed with
+    set_tile and chunks newly explored are patched in through map and fog
+    listeners. Each frame only the dots change: the terrain under last
+    frame's dots is put back and the new dots drawn, so the cost doesn't
+    grow with the size of the world."""
+    SIZE = 150  # length of the longer side in pixels
+    MARGIN = 10  # pixels between the minimap and the screen's top right
+    DOT_SIZE = 3  # width and height of a dot in pixels
+    PLAYER_COLOUR = (255, 255, 255)
+    ENEMY_COLOUR = (255, 40, 40)
+    BORDER_COLOUR = (0, 0, 0)
+    UNEXPLORED_COLOUR = (0, 0, 0)
+
+    map = None  # MapClass shown
+    fog = None  # Fog with the explored tiles (None shows the whole map)
+    colours = None  # numpy array of tile colours, by tile value + 2
+    scale_x = 1.0  # minimap pixels per tile
+    scale_y = 1.0
+    terrain = None  # scaled terrain, without dots
+    known = None  # terrain with the unexplored tiles hidden
+    surface = None  # known terrain with this frame's dots on it
+    dot_rects = None  # areas of surface covered by dots
+
+    def __init__(self, map, fog=None):
+        self.map = map
+        self.fog = fog
+        self.colours = self.tile_colours()
+
+        scale = float(self.SIZE) / max(MAP.SIZE_X, MAP.SIZE_Y)
+        size = (max(1, int(MAP.SIZE_X * scale)),
+                max(1, int(MAP.SIZE_Y * scale)))
+        self.scale_x = size[0] / float(MAP.SIZE_X)
+        self.scale_y = size[1] / float(MAP.SIZE_Y)
+
+        self.terrain = self.render_terrain(size)
+        self.known = self.terrain.copy()
+        if fog is not None:
+            self.known.fill(self.UNEXPLORED_COLOUR)
+        self.surface = self.known.copy()
+        if fog is not None:
+            for chunk_x in xrange((MAP.SIZE_X + MAP.CHUNK_SIZE - 1) / MAP.CHUNK_SIZE):
+                for chunk_y in xrange((MAP.SIZE_Y + MAP.CHUNK_SIZE - 1) / MAP.CHUNK_SIZE):
+                    if fog.chunk_state(chunk_x, chunk_y) != fog.UNEXPLORED:
+                        self.chunk_explored(chunk_x, chunk_y)
+            fog.listeners.append(self.chunk_explored)  # follow exploring
+        self.dot_rects = []
+        map.listeners.append(self.tile_changed)  # follow set_tile() changes
+
+    @staticmethod
+    def tile_colours():
+        """Returns the average colour of each tile image as a numpy array
+           indexed by tile value + 2 (so sea is 0 and sand 1)"""
+        filenames = ([MAP.SEA_TILE[1][0], MAP.SEA_TILE[0][0]] +
+                     [filename for weight, filename in MAP.TILE_INFO])
+        return numpy.array(
+            [pygame.transform.average_color(assets.image(filename))[:3]
+             for filename in filenames], numpy.uint8)
+
+    def render_terrain(self, size):
+        """Draws the map one pixel per tile and scales it to size"""
+        tiles = numpy.asarray(self.map.map).astype(numpy.intp) + 2
+        small = pygame.Surface((MAP.SIZE_X, MAP.SIZE_Y), 0, 32)
+        pygame.surfarray.blit_array(small, self.colours[tiles])
+        terrain = pygame.transform.smoothscale(small, size)
+        if pygame.display.get_surface() is not None:
+            terrain = terrain.convert()
+        return terrain
+
+    def tile_rect(self, x, y):
+        """Returns the area of the minimap covering tile x, y"""
+        left = int(x * self.scale_x)
+        top = int(y * self.scale_y)
+        return pygame.Rect(left, top,
+                           max(1, int((x + 1) * self.scale_x) - left),
+                           max(1, int((y + 1) * self.scale_y) - top))
+
+    def tile_changed(self, x, y):
+        """Map listener: repaints a changed tile"""
+        rect = self.tile_rect(x, y)
+        self.terrain.fill(self.colours[self.map.map[x][y] + 2], rect)
+        if self.fog is None or self.fog.is_explored(x, y):
+            self.known.blit(self.terrain, rect, rect)
+            self.surface.blit(self.known, rect, rect)
+
+    def chunk_explored(self, chunk_x, chunk_y):
+        """Fog listener: reveals a chunk's explored tiles"""
+        left, top = chunk_x * MAP.CHUNK_SIZE, chunk_y * MAP.CHUNK_SIZE
+        right = min(left + MAP.CHUNK_SIZE, MAP.SIZE_X)
+        bottom = min(top + MAP.CHUNK_SIZE, MAP.SIZE_Y)
+        rect = self.tile_rect(left, top).union(self.tile_rect(right - 1, bottom - 1))
+
+        self.known.blit(self.terrain, rect, rect)
+        explored = self.fog.explored_tiles(left, top, right, bottom)
+        for x, y in zip(*numpy.nonzero(~explored)):
+            self.known.fill(self.UNEXPLORED_COLOUR, self.tile_rect(left + x, top + y))
+        self.surface.blit(self.known, rect, rect)
+
+    def update(self, player, enemies):
+        """Moves the dots to where the player and enemies are now"""
+        for rect in self.dot_rects:
+            self.surface.blit(self.known, rect, rect)
+        self.dot_rects = [self.draw_dot(enemy, self.ENEMY_COLOUR)
+                          for enemy in enemies]
+        self.dot_rects.append(self.draw_dot(player, self.PLAYER_COLOUR))
+
+    def draw_dot(self, obj, colour):
+        """Draws an object's dot, returning the area it covers"""
+        rect = pygame.Rect(0, 0, self.DOT_SIZE, self.DOT_SIZE)
+        rect.center = (int(obj.x * self.scale_x), int(obj.y * self.scale_y))
+        return self.surface.fill(colour, rect)
+
+    def render(self, screen):
+        """Draws the minimap in the top right corner of screen"""
+        position = (screen.get_width() - self.surface.get_width() - self.MARGIN,
+                    self.MARGIN)
+        screen.blit(self.surface, position)
+        pygame.draw.rect(screen, self.BORDER_COLOUR,
+                         self.surface.get_rect(topleft=position).inflate(2, 2), 1)
@@ -0,0 +1,50 @@
+import numpy
+
+
+def lattice_values(seed, ix, iy):
+    """Returns a pseudo-random float in [0, 1) for each integer lattice
+       point (ix, iy). The same point always gets the same value, so any
+       region can be evaluated on its own."""
+    with numpy.errstate(over="ignore"):
+        h = (ix.astype(numpy.uint32) * numpy.uint32(374761393) +
+             iy.astype(numpy.uint32) * numpy.uint32(668265263) +
+             numpy.uint32(seed & 0xffffffff) * numpy.uint32(2246822519))
+        h = (h ^ (h >> numpy.uint32(13))) * numpy.uint32(1274126177)
+        h ^= h >> numpy.uint32(16)
+    return h / float(2 ** 32)
+
+
+def value_noise(seed, xs, ys, scale):
+    """Smoothly interpolated value noise at points (xs, ys) (NumPy arrays
+       of tile coordinates), with features roughly scale tiles across.
+       Returns values in [0, 1)."""
+    fx = numpy.asarray(xs, dtype=numpy.float64) / scale
+    fy = numpy.asarray(ys, dtype=numpy.float64) / scale
+    x0 = numpy.floor(fx).astype(numpy.int64)
+    y0 = numpy.floor(fy).astype(numpy.int64)
+
+    # Smoothstep the position within each lattice cell
+    tx = fx - x0
+    ty = fy - y0
+    tx = tx * tx * (3 - 2 * tx)
+    ty = ty * ty * (3 - 2 * ty)
+
+    top = (lattice_values(seed, x0, y0) * (1 - tx) +
+           lattice_values(seed, x0 + 1, y0) * tx)
+    bottom = (lattice_values(seed, x0, y0 + 1) * (1 - tx) +
+              lattice_values(seed, x0 + 1, y0 + 1) * tx)
+    return top * (1 - ty) + bottom * ty
+
+
+def fractal_noise(seed, xs, ys, scale, octaves=4, persistence=0.5):
+    """Sums octaves of value noise, each half the size and persistence
+       times the strength of the last. Returns values in [0, 1)."""
+    total = numpy.zeros(numpy.broadcast(xs, ys).shape)
+    amplitude = 1.0
+    total_amplitude = 0.0
+    for octave in range(octaves):
+        total += amplitude * value_noise(seed + octave * 7919, xs, ys, scale)
+        total_amplitude += amplitude
+        amplitude *= persistence
+        scale /= 2.0
+    return total / total_amplitude
@@ -0,0 +1,239 @@
+import math
+
+from Map import MAP
+
+
+class ObjectManager:
+    """Owns every active object in the game.
+
+    Objects are never added or removed while the game is iterating over
+    them: spawn, add and despawn only queue the change, and flush applies
+    the queues between ticks. Classes with pooled = True are kept on a
+    free list when despawned and handed out again (through their reset
+    method) by the next spawn, so objects created and destroyed all the
+    time don't churn the garbage collector.
+
+    The manager iterates like the old object list (in spawn order, so the
+    player stays first) and keeps an index per class, so of_type gives
+    every object of a class and its subclasses without isinstance scans.
+
+    update runs the objects' updates. Objects far from the camera are
+    updated less often (see UPDATE_TIERS), getting all the time since
+    their last update as their delta time. Objects that report is_idle
+    after updating go to sleep and aren't touched at all until the
+    player comes within their wake_range or something bumps into them.
+    """
+    MAX_POOL = 1024  # most despawned objects kept per class
+    # (distance from the camera centre in screen sizes, ticks between
+    #  updates) from nearest to furthest; further still uses the last
+    UPDATE_TIERS = ((1.0, 1), (2.0, 4), (4.0, 16))
+
+    objects = None  # active objects, in spawn order
+    by_type = None  # class: list of active objects of that class or a subclass
+    pools = None  # class: list of despawned objects ready for reuse
+    spawn_queue = None  # objects to add at the next flush
+    despawn_queue = None  # objects to remove at the next flush
+    class_bases = None  # class: its class and all its base classes
+    awake = None  # active objects that aren't asleep, in update order
+    sleeping = None  # (chunk x, chunk y): sleeping objects in that chunk
+    woken = None  # objects woken this tick, awake from the next update
+    tick = 0  # number of updates run
+    next_phase = 0  # spreads reduced-rate objects over different ticks
+    wake_chunks = 1  # chunks around the player searched for objects to wake
+                     # (enough for the largest wake_range put to sleep)
+
+    def __init__(self):
+        self.objects = []
+        self.by_type = dict()
+        self.pools = dict()
+        self.spawn_queue = []
+        self.despawn_queue = []
+        self.class_bases = dict()
+        self.awake = []
+        self.sleeping = dict()
+        self.woken = []
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+    def bases(self, cls):
+        """Returns cls and its base classes (cached)"""
+        if cls not in self.class_bases:
+            # Walked by hand rather than with inspect.getmro, since inspect
+            # is slow to import
+            bases = [cls]
+            for base in cls.__bases__:
+                bases.extend(base for base in self.bases(base)
+                             if base not in bases)
+            self.class_bases[cls] = tuple(bases)
+        return self.class_bases[cls]
+
+    def spawn(self, cls, x, y):
+        """Returns a cls object at x, y, reused from the pool if possible.
+           It joins the game at the next flush."""
+        pool = self.pools.get(cls)
+        if pool:
+            obj = pool.pop()
+            obj.reset(x, y)
+        else:
+            obj = cls(x, y)
+        self.add(obj)
+        return obj
+
+    def add(self, obj):
+        """Queues an already made object to join the game"""
+        obj.despawning = False
+        self.spawn_queue.append(obj)
+
+    def despawn(self, obj):
+        """Queues an object to leave the game"""
+        if not obj.despawning:
+            obj.despawning = True
+            self.despawn_queue.append(obj)
+
+    def of_type(self, cls):
+        """Returns the active objects of cls or a subclass of it. The list
+           belongs to the manager and changes on flush; don't modify it."""
+        if cls not in self.by_type:
+            self.by_type[cls] = [obj for obj in self.objects
+                                 if isinstance(obj, cls)]
+        return self.by_type[cls]
+
+    def flush(self):
+        """Applies the queued spawns and despawns. Call between ticks."""
+        if self.despawn_queue:
+            self.remove_despawned(self.objects)
+            self.remove_despawned(self.awake)
+            for objects in self.by_type.itervalues():
+                self.remove_despawned(objects)
+            for obj in self.despawn_queue:
+                if obj.asleep:
+                    self.unbucket(obj)
+                    obj.asleep = False
+                cls = obj.__class__
+                if obj.despawning and cls.pooled:
+                    pool = self.pools.setdefault(cls, [])
+                    if len(pool) < self.MAX_POOL:
+                        pool.append(obj)
+            del self.despawn_queue[:]
+
+        for obj in self.spawn_queue:
+            if obj.despawning:
+                continue  # despawned before it ever joined
+            self.objects.append(obj)
+            obj.pending_time = 0.0
+            obj.update_phase = self.next_phase
+            self.next_phase += 1
+            self.awake.append(obj)
+            for cls in self.bases(obj.__class__):
+                if cls in self.by_type:
+                    self.by_type[cls].append(obj)
+        del self.spawn_queue[:]
+
+    def update(self, delta_time, player, map, camera):
+        """Updates the awake objects due an update this tick"""
+        self.tick += 1
+        self.wake_near(player)
+
+        # Camera centre and half the view, in tiles
+        half_width = float(camera.view_width) / 2 / MAP.TILE_SIZE
+        half_height = float(camera.view_height) / 2 / MAP.TILE_SIZE
+        centre_x = camera.x + half_width
+        centre_y = camera.y + half_height
+
+        fell_asleep = False
+        for obj in self.awake:
+            if obj.despawning:
+                continue
+            obj.pending_time += delta_time
+
+            # Pick the update rate from the distance from the camera
+            screens = max(abs(obj.x - centre_x) / half_width,
+                          abs(obj.y - centre_y) / half_height)
+            for tier_distance, interval in self.UPDATE_TIERS:
+                if screens <= tier_distance:
+                    break
+            if (self.tick + obj.update_phase) % interval != 0:
+                continue
+
+            obj.update(obj.pending_time, player, self, map)
+            obj.pending_time = 0.0
+            if obj.is_idle(player):
+                self.sleep(obj)
+                fell_asleep = True
+
+        if fell_asleep:
+            kept = 0
+            for obj in self.awake:
+                if not obj.asleep:
+                    self.awake[kept] = obj
+                    kept += 1
+            del self.awake[kept:]
+        if self.woken:
+            self.awake.extend(self.woken)
+            del self.woken[:]
+
+    @staticmethod
+    def chunk_of(obj):
+        """Returns the chunk an object is in"""
+        return int(obj.x) // MAP.CHUNK_SIZE, int(obj.y) // MAP.CHUNK_SIZE
+
+    def sleep(self, obj):
+        """Puts an object to sleep"""
+        obj.asleep = True
+        obj.sleep_chunk = self.chunk_of(obj)
+        self.wake_chunks = max(self.wake_chunks,
+                               int(math.ceil(float(obj.wake_range) / MAP.CHUNK_SIZE)))
+        self.sleeping.setdefault(obj.sleep_chunk, []).append(obj)
+
+    def unbucket(self, obj):
+        """Removes a sleeping object from its chunk's bucket"""
+        bucket = self.sleeping[obj.sleep_chunk]
+        bucket.remove(obj)
+        if not bucket:
+            del self.sleeping[obj.sleep_chunk]
+
+    def wake(self, obj):
+        """Wakes a sleeping object; it updates again from the next tick"""
+        if not obj.asleep or obj.despawning:
+            return
+        self.unbucket(obj)
+        obj.asleep = False
+        obj.pending_time = 0.0
+        self.woken.append(obj)
+
+    def wake_near(self, player):
+        """Wakes sleeping objects the player is within wake_range of"""
+        if not self.sleeping:
+            return
+        player_x, player_y = self.chunk_of(player)
+        for chunk_x in xrange(player_x - self.wake_chunks,
+                              player_x + self.wake_chunks + 1):
+            for chunk_y in xrange(player_y - self.wake_chunks,
+                                  player_y + self.wake_chunks + 1):
+                bucket = self.sleeping.get((chunk_x, chunk_y))
+                if not bucket:
+                    continue
+                for obj in list(bucket):
+                    to_x = obj.x - player.x
+                    to_y = obj.y - player.y
+                    if to_x * to_x + to_y * to_y < \
+                            obj.wake_range * obj.wake_range:
+                        self.wake(obj)
+
+    @staticmethod
+    def remove_despawned(objects):
+        """Removes despawning objects from a list in place, keeping the
+           order of the rest"""
+        kept = 0
+        for obj in objects:
+            if not obj.despawning:
+                objects[kept] = obj
+                kept += 1
+        del objects[kept:]
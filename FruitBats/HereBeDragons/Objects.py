@@ -11,11 +11,20 @@ class Object:
     # Main variables for characters
     x = 0  # in game tile units (1.0 = 1 tile)
     y = 0  # in game tile units
-    sprite = None  # current object sprite (todo: animations etc)
+    sprite = None  # current object sprite (set from animator if there is one)
+    animator = None  # Animator choosing the sprite each frame, if animated
     collision = None  # collision data (None=no collision/ghost)
     sprite_angle = 0  # angle of rotation for this sprite in degrees
     sprite_origin = None  # origin of sprite
     collision = None  # collision data (instantiate this in __init__)
+    save_fields = ("x", "y")  # attributes kept in save games (None = not saved)
+    pooled = False  # reuse despawned objects of this class (see ObjectManager)
+    despawning = False  # queued to leave the game (see ObjectManager)
+    asleep = False  # skipped by updates until woken (see ObjectManager)
+    sleep_chunk = None  # chunk the object fell asleep in
+    wake_range = 0  # wakes when the player is nearer than this, in tiles
+    pending_time = 0.0  # time passed since the object last updated
+    update_phase = 0  # offsets which ticks a reduced-rate object updates on
 
     def __init__(self, x, y):
         """Initialise object at the given position"""
@@ -26,8 +35,30 @@ class Object:
     def update(self, delta_time, player, object_list, map):
         pass  # to be overloaded by objects
 
+    def is_idle(self, player):
+        """Returns True if the object has nothing to do until woken
+           (overload for objects that can sleep)"""
+        return False
+
+    def reset(self, x, y):
+        """Readies a pooled object for reuse at the given position
+           (overload to reset any other state)"""
+        self.x = x
+        self.y = y
+
+    def save_state(self):
+        """Returns the values of save_fields as a tuple for save games"""
+        return tuple(getattr(self, field) for field in self.save_fields)
+
+    def load_state(self, state):
+        """Restores values returned by save_state"""
+        for field, value in zip(self.save_fields, state):
+            setattr(self, field, value)
+
     def render(self, screen, camera):
         """Renders the object (function overloadable by subclasses)"""
+        if self.animator is not None:
+            self.sprite = self.animator.frame()
         if self.sprite is not None:
             if self.sprite_angle is not 0:
                 # Clamp sprite_angle to 0 <= x < 360 with math magic
@@ -124,6 +155,8 @@ class Object:
                     desired_x = self.x
                     desired_y = self.y
                     collided = True
+                    if object.asleep:
+                        object_list.wake(object)  # bumped into it
 
         self.x = desired_x
         self.y = desired_y
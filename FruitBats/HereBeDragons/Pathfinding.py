@@ -0,0 +1,383 @@
+import time
+import heapq
+from collections import OrderedDict, deque
+
+import numpy
+
+from Map import MAP
+
+
+class PathRequest:
+    start = None  # (x, y) tile the path starts from
+    goal = None  # (x, y) tile the path should reach
+    callback = None  # function called with the finished path (or None)
+    cancelled = False  # set to True to drop the request before it runs
+
+    def __init__(self, start, goal, callback):
+        self.start = start
+        self.goal = goal
+        self.callback = callback
+
+    def cancel(self):
+        """Stops the request from being processed"""
+        self.cancelled = True
+
+
+class Pathfinder:
+    """Hierarchical A* (HPA*) over the map grid.
+
+    The map is split into square clusters of MAP.CHUNK_SIZE tiles. Entrances
+    between neighbouring clusters form an abstract graph which is searched
+    first; the result is then refined into a tile path from precomputed
+    intra-cluster paths. Abstract routes are cached per
+    (start cluster, goal cluster) pair.
+    """
+    CACHE_SIZE = 256  # maximum number of cached cluster-to-cluster routes
+    MAX_ENTRANCE_WIDTH = 6  # entrances wider than this get a node each end
+    TIME_BUDGET = 0.002  # seconds per update() spent on queued requests
+
+    map = None  # MapClass being navigated
+    size_x = 0  # map size in tiles
+    size_y = 0
+    cluster_size = 0  # width and height of a cluster in tiles
+    clusters_x = 0  # number of clusters along each axis
+    clusters_y = 0
+    obstacles = None  # set of (x, y) tiles blocked by objects
+    entrances = None  # {(cluster, cluster): [(node, node), ...]}
+    nodes = None  # {cluster: set of abstract nodes inside it}
+    edges = None  # {node: {node: cost}}
+    intra_paths = None  # {(node, node): [tiles]} inside a single cluster
+    cache = None  # OrderedDict {(cluster, cluster): (route, clusters)}
+    requests = None  # deque of pending PathRequests
+    listeners = None  # functions called with (x, y) when a tile's walkability may change
+
+    def __init__(self, map, cluster_size=MAP.CHUNK_SIZE):
+        self.map = map
+        self.size_x = MAP.SIZE_X
+        self.size_y = MAP.SIZE_Y
+        self.cluster_size = cluster_size
+        self.clusters_x = (self.size_x + cluster_size - 1) / cluster_size
+        self.clusters_y = (self.size_y + cluster_size - 1) / cluster_size
+        self.obstacles = set()
+        self.entrances = dict()
+        self.nodes = dict()
+        self.edges = dict()
+        self.intra_paths = dict()
+        self.cache = OrderedDict()
+        self.requests = deque()
+        self.listeners = []
+
+        self.rebuild_clusters([(cx, cy) for cy in range(self.clusters_y)
+                               for cx in range(self.clusters_x)])
+        map.listeners.append(self.invalidate)  # follow set_tile() changes
+
+    # Grid helpers
+
+    def walkable(self, x, y):
+        """Returns True if the tile at x, y can be walked over"""
+        if x < 0 or y < 0 or x >= self.size_x or y >= self.size_y:
+            return False
+        if (x, y) in self.obstacles:
+            return False
+        return self.map.map[x][y] not in MAP.BLOCKED_TILES
+
+    def blocked_grid(self):
+        """Returns a bool array, indexed [x][y], of the tiles that can't
+           be walked over"""
+        grid = numpy.in1d(self.map.map, MAP.BLOCKED_TILES).reshape(
+            self.map.map.shape)
+        for x, y in self.obstacles:
+            grid[x, y] = True
+        return grid
+
+    def cluster_of(self, (x, y)):
+        """Returns the cluster containing the tile x, y"""
+        return x / self.cluster_size, y / self.cluster_size
+
+    def cluster_bounds(self, (cx, cy)):
+        """Returns the (left, top, right, bottom) tiles of a cluster,
+           right and bottom exclusive"""
+        left = cx * self.cluster_size
+        top = cy * self.cluster_size
+        return (left, top, min(left + self.cluster_size, self.size_x),
+                min(top + self.cluster_size, self.size_y))
+
+    def cluster_neighbours(self, (cx, cy)):
+        """Returns the clusters sharing an edge with the given cluster"""
+        result = []
+        for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            if 0 <= nx < self.clusters_x and 0 <= ny < self.clusters_y:
+                result.append((nx, ny))
+        return result
+
+    # Abstract graph construction
+
+    def find_entrances(self, cluster_a, cluster_b):
+        """Returns the node pairs connecting two neighbouring clusters,
+           cluster_a being the left or upper one"""
+        left, top, right, bottom = self.cluster_bounds(cluster_a)
+        if cluster_b[0] != cluster_a[0]:
+            # Vertical border: tiles in column right-1 face column right
+            border = [((right - 1, y), (right, y)) for y in range(top, bottom)]
+        else:
+            # Horizontal border: tiles in row bottom-1 face row bottom
+            border = [((x, bottom - 1), (x, bottom)) for x in range(left, right)]
+
+        # Split the border into continuous walkable runs
+        runs = []
+        run = []
+        for a, b in border:
+            if self.walkable(*a) and self.walkable(*b):
+                run.append((a, b))
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+
+        # One transition in the middle of short runs, one each end of long runs
+        result = []
+        for run in runs:
+            if len(run) > self.MAX_ENTRANCE_WIDTH:
+                result.append(run[0])
+                result.append(run[-1])
+            else:
+                result.append(run[len(run) / 2])
+        return result
+
+    def rebuild_clusters(self, clusters, borders=True):
+        """Recomputes the entrances and edges of the given clusters. If
+           borders is False only paths inside the clusters changed, so
+           their entrances and neighbouring clusters are left alone."""
+        changed = set(clusters)
+        affected = set(changed)
+        if borders:
+            for cluster in changed:
+                affected.update(self.cluster_neighbours(cluster))
+
+        # Forget every node and path belonging to an affected cluster
+        for cluster in affected:
+            for node in self.nodes.get(cluster, ()):
+                for other in self.edges.pop(node, {}):
+                    if other in self.edges:
+                        self.edges[other].pop(node, None)
+        for key in self.intra_paths.keys():
+            if self.cluster_of(key[0]) in affected:
+                del self.intra_paths[key]
+
+        # Recompute the entrances on every border of a changed cluster
+        for cluster in (changed if borders else ()):
+            for neighbour in self.cluster_neighbours(cluster):
+                pair = (min(cluster, neighbour), max(cluster, neighbour))
+                self.entrances[pair] = self.find_entrances(*pair)
+
+        # Collect nodes and rebuild inter-cluster edges
+        for cluster in affected:
+            self.nodes[cluster] = set()
+        for (cluster_a, cluster_b), pairs in self.entrances.iteritems():
+            if cluster_a not in affected and cluster_b not in affected:
+                continue
+            for a, b in pairs:
+                if cluster_a in affected:
+                    self.nodes[cluster_a].add(a)
+                if cluster_b in affected:
+                    self.nodes[cluster_b].add(b)
+                self.edges.setdefault(a, dict())[b] = 1
+                self.edges.setdefault(b, dict())[a] = 1
+
+        # Connect nodes inside each affected cluster
+        for cluster in affected:
+            bounds = self.cluster_bounds(cluster)
+            nodes = self.nodes[cluster]
+            for node in nodes:
+                self.edges.setdefault(node, dict())
+                paths = self.search_local(node, nodes, bounds)
+                for target, path in paths.iteritems():
+                    if target == node:
+                        continue
+                    self.edges[node][target] = len(path) - 1
+                    self.intra_paths[(node, target)] = path
+
+        # Drop cached routes passing through anything that changed
+        for key, (route, clusters) in self.cache.items():
+            if not clusters.isdisjoint(affected):
+                del self.cache[key]
+
+    # Searches
+
+    def search_local(self, start, targets, bounds):
+        """Dijkstra from start restricted to bounds; returns a dict of
+           {target: [tiles from start to target]} for reachable targets"""
+        left, top, right, bottom = bounds
+        remaining = set(targets)
+        came_from = {start: None}
+        frontier = deque([start])
+        found = dict()
+        # All steps cost 1, so breadth-first order is Dijkstra order
+        while frontier and remaining:
+            current = frontier.popleft()
+            if current in remaining:
+                remaining.discard(current)
+                found[current] = self.trace(came_from, current)
+            x, y = current
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if (nx, ny) in came_from:
+                    continue
+                if not (left <= nx < right and top <= ny < bottom):
+                    continue
+                if not self.walkable(nx, ny):
+                    continue
+                came_from[(nx, ny)] = current
+                frontier.append((nx, ny))
+        return found
+
+    def search_abstract(self, start, goal, start_links, goal_links):
+        """A* over the abstract graph from start to goal, where start_links
+           and goal_links are {node: cost} for the temporary end nodes"""
+        def heuristic(node):
+            return abs(node[0] - goal[0]) + abs(node[1] - goal[1])
+
+        open_heap = [(heuristic(start), 0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        while open_heap:
+            priority, cost, current = heapq.heappop(open_heap)
+            if current == goal:
+                return self.trace(came_from, goal)
+            if cost > cost_so_far[current]:
+                continue  # stale heap entry
+            candidates = self.edges.get(current, {}).items()
+            if current == start:
+                candidates.extend(start_links.items())
+            if current in goal_links:
+                candidates.append((goal, goal_links[current]))
+            for neighbour, step in candidates:
+                new_cost = cost + step
+                if new_cost < cost_so_far.get(neighbour, new_cost + 1):
+                    cost_so_far[neighbour] = new_cost
+                    came_from[neighbour] = current
+                    heapq.heappush(open_heap, (new_cost + heuristic(neighbour),
+                                               new_cost, neighbour))
+        return None
+
+    def trace(self, came_from, node):
+        """Walks back along came_from and returns the path ending at node"""
+        path = []
+        while node is not None:
+            path.append(node)
+            node = came_from[node]
+        path.reverse()
+        return path
+
+    def find_path(self, start, goal):
+        """Returns a list of tiles from start to goal (inclusive), or None
+           if the goal cannot be reached"""
+        start = (int(start[0]), int(start[1]))
+        goal = (int(goal[0]), int(goal[1]))
+        if not (self.walkable(*start) and self.walkable(*goal)):
+            return None
+        if start == goal:
+            return [start]
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+
+        # Try staying inside the cluster first
+        if start_cluster == goal_cluster:
+            local = self.search_local(start, [goal],
+                                      self.cluster_bounds(start_cluster))
+            if goal in local:
+                return local[goal]
+
+        # Connect the end points to the nodes of their clusters
+        start_paths = self.search_local(start, self.nodes[start_cluster],
+                                        self.cluster_bounds(start_cluster))
+        goal_paths = self.search_local(goal, self.nodes[goal_cluster],
+                                       self.cluster_bounds(goal_cluster))
+        if not start_paths or not goal_paths:
+            return None
+
+        # Reuse a cached route between the two clusters if its ends connect
+        key = (start_cluster, goal_cluster)
+        route = None
+        if key in self.cache:
+            cached_route = self.cache[key][0]
+            if cached_route[0] in start_paths and cached_route[-1] in goal_paths:
+                route = cached_route
+                self.cache[key] = self.cache.pop(key)  # mark recently used
+
+        if route is None:
+            start_links = dict((node, len(path) - 1)
+                               for node, path in start_paths.iteritems())
+            goal_links = dict((node, len(path) - 1)
+                              for node, path in goal_paths.iteritems())
+            abstract = self.search_abstract(start, goal,
+                                            start_links, goal_links)
+            if abstract is None:
+                return None
+            route = abstract[1:-1]
+            if route and route[0] in start_paths and route[-1] in goal_paths:
+                self.cache[key] = (route, set(self.cluster_of(node)
+                                              for node in route))
+                while len(self.cache) > self.CACHE_SIZE:
+                    self.cache.popitem(last=False)  # evict least recently used
+
+        # Refine the abstract route into tiles
+        path = [start]
+        waypoints = [start] + route + [goal]
+        for a, b in zip(waypoints, waypoints[1:]):
+            if a == b:
+                continue
+            elif (a, b) in self.intra_paths:
+                segment = self.intra_paths[(a, b)]
+            elif a == start and b in start_paths:
+                segment = start_paths[b]
+            elif b == goal and a in goal_paths:
+                segment = goal_paths[a][::-1]
+            else:
+                segment = [a, b]  # entrance tiles either side of a border
+            path.extend(segment[1:])
+        return path
+
+    # Terrain changes
+
+    def invalidate(self, x, y):
+        """Call when the tile at x, y changes walkability (done
+           automatically for MapClass.set_tile)"""
+        on_border = (x % self.cluster_size in (0, self.cluster_size - 1) or
+                     y % self.cluster_size in (0, self.cluster_size - 1))
+        self.rebuild_clusters([self.cluster_of((x, y))], on_border)
+        for listener in self.listeners:
+            listener(x, y)
+
+    def set_blocked(self, x, y, blocked):
+        """Marks or unmarks the tile at x, y as blocked by an object"""
+        if blocked:
+            self.obstacles.add((x, y))
+        else:
+            self.obstacles.discard((x, y))
+        self.invalidate(x, y)
+
+    # Time-sliced requests
+
+    def request_path(self, start, goal, callback):
+        """Queues a path search; callback(path) is called from update().
+           Returns the PathRequest so it can be cancelled."""
+        request = PathRequest(start, goal, callback)
+        self.requests.append(request)
+        return request
+
+    def update(self, time_budget=TIME_BUDGET):
+        """Processes queued requests until time_budget seconds have passed.
+           At least one request is processed per call; a time_budget of
+           None processes them all, so the results don't depend on how
+           fast the machine is."""
+        if time_budget is not None:
+            end_time = time.time() + time_budget
+        while self.requests:
+            request = self.requests.popleft()
+            if request.cancelled:
+                continue
+            request.callback(self.find_path(request.start, request.goal))
+            if time_budget is not None and time.time() >= end_time:
+                break
@@ -6,10 +6,13 @@ import pygame
 
 # Project imports
 from Characters import Character
-from Map import MapClass
+from Map import MapClass, MAP
 from Collision import CollisionParams
 from Helpers import *
 from DynaSword import DynaSword
+from Projectiles import ProjectileType, projectiles
+from Input import input_state
+from Animation import SpriteSheet, Animator, IDLE, WALK, ATTACK
 
 
 class Player(Character):
@@ -19,11 +22,20 @@ class Player(Character):
     x_velocity = 0.0  # Rate of movement per axis in tiles/sec
     y_velocity = 0.0
     dynasword = None  # Pointer to dynasword
+    throw_cooldown = 0.0  # seconds until the next knife can be thrown
+    THROW_RATE = 10  # knives thrown per second while F is held
+    KNIFE = ProjectileType("graphics/sword.png", (12, 36), speed=14.0, lifetime=1.5,
+                           radius=0.15, damage=1, knockback=3)
+    save_fields = ("x", "y", "x_velocity", "y_velocity")
+    # Frame table for the player's sprite sheet (one frame for now)
+    ANIMATIONS = {IDLE: (0, 1, 0.1, True),
+                  WALK: (0, 1, 0.1, True),
+                  ATTACK: (0, 1, 0.2, False)}
 
     def __init__(self, x, y):
         """Init: Loads default player sprite and scales it up"""
         # Load character image
-        self.sprite = pygame.image.load('graphics/game_character.png')
+        self.set_sprite_sheet(SpriteSheet.get('graphics/game_character.png'))
         # Scale character so we can see his beauty
         #self.sprite = pygame.transform.smoothscale(
         #                self.sprite,
@@ -37,25 +49,29 @@ class Player(Character):
         # self.collision = CollisionParams((10, 1), (39, 72), True)
         self.collision = CollisionParams((0 + 10, 0 + 10), (self.size[0] - 20, self.size[1] - 20), True)
 
+    def set_sprite_sheet(self, sheet):
+        """Animates the player with frames from sheet"""
+        self.animator = Animator(sheet.animations(self.ANIMATIONS))
+        self.sprite = self.animator.frame()
+
     def update(self, delta_time, player, object_list, map):
         # Perform updates
         self.update_movement(delta_time, player, object_list, map)
         self.update_attacks(delta_time, player, object_list, map)
+        self.animator.update(self.x_velocity != 0 or self.y_velocity != 0)
 
     def update_movement(self, delta_time, player, object_list, map):
         # Perform character movement
-        key_pressed = pygame.key.get_pressed()
-
         # Make a normalised vector of movement based on user input
         move_x = 0.0
         move_y = 0.0
-        if key_pressed[pygame.K_w]:
+        if input_state.key_held(pygame.K_w):
             move_y -= 1.0
-        if key_pressed[pygame.K_s]:
+        if input_state.key_held(pygame.K_s):
             move_y += 1.0
-        if key_pressed[pygame.K_d]:
+        if input_state.key_held(pygame.K_d):
             move_x += 1.0
-        if key_pressed[pygame.K_a]:
+        if input_state.key_held(pygame.K_a):
             move_x -= 1.0
 
         vec_length = distance((0, 0), (move_x, move_y))
@@ -108,17 +124,25 @@ class Player(Character):
             self.y_velocity = 0
 
     def update_attacks(self, delta_time, player, object_list, map):
-        # Create sword
-        # TODO: Consult Michael about this. There should be a way to call
-        # game.CreateObject or something like that. Should be done on init.
+        # Create sword (it joins the object list after this tick)
         if self.dynasword is None:
-            self.dynasword = DynaSword(self.x, self.y)
-            object_list.append(self.dynasword)
+            self.dynasword = object_list.spawn(DynaSword, self.x, self.y)
 
         # Basic attack
-        if pygame.mouse.get_pressed()[0]:
+        if input_state.buttons_pressed[0]:
+            self.animator.attack()
+        if input_state.mouse_buttons[0]:
             self.dynasword.attack()
-        if pygame.mouse.get_pressed()[2]:
+        if input_state.mouse_buttons[2]:
             self.dynasword.block()
-        if pygame.mouse.get_pressed()[1]:
+        if input_state.mouse_buttons[1]:
             self.dynasword.boomerang()
+
+        # Throw knives at the mouse while F is held
+        self.throw_cooldown = max(self.throw_cooldown - delta_time, 0.0)
+        if input_state.key_held(pygame.K_f) and self.throw_cooldown == 0:
+            self.throw_cooldown = 1.0 / self.THROW_RATE
+            origin_x = self.x + float(self.sprite.get_width()) / 2 / MAP.TILE_SIZE
+            origin_y = self.y + float(self.sprite.get_height()) / 2 / MAP.TILE_SIZE
+            projectiles.fire(self.KNIFE, origin_x, origin_y, math.degrees(
+                direction((origin_x, origin_y), input_state.mouse_world)))
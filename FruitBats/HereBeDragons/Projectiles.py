@@ -0,0 +1,285 @@
+import math
+
+import numpy
+import pygame
+
+from Map import MAP
+from Assets import assets
+from Helpers import Vector
+from Combat import Combat, combat
+
+
+class ProjectileType:
+    """A kind of projectile, like a throwing knife. Every projectile of a
+    type shares one sprite, pre-rotated to ROTATIONS angles the first time
+    one is drawn."""
+    ROTATIONS = 32  # angles the sprite is pre-rotated to
+
+    def __init__(self, sprite_file, sprite_size, speed, lifetime, radius,
+                 damage, knockback, spin=0):
+        self.sprite_file = sprite_file
+        self.sprite_size = sprite_size  # (width, height) in pixels, pointing up
+        self.speed = speed  # tiles/sec
+        self.lifetime = lifetime  # seconds before it drops
+        self.radius = radius  # tiles
+        self.damage = damage
+        self.knockback = knockback  # tiles/sec
+        self.spin = spin  # degrees/sec turned in flight
+
+    def rotations(self):
+        """Returns the rotated sprites and a numpy array of the offsets
+           from the centre to the top left of each"""
+        key = ("projectile", self.sprite_file, self.sprite_size, self.ROTATIONS)
+        return assets.get(key, self.make_rotations)
+
+    def make_rotations(self):
+        sprite = assets.load_image(self.sprite_file, True)
+        if sprite.get_size() != self.sprite_size:
+            sprite = pygame.transform.smoothscale(sprite, self.sprite_size)
+        frames = [pygame.transform.rotate(sprite, 360.0 * step / self.ROTATIONS)
+                  for step in xrange(self.ROTATIONS)]
+        offsets = numpy.array([(-frame.get_width() / 2, -frame.get_height() / 2)
+                               for frame in frames], numpy.intp)
+        return frames, offsets
+
+
+class ProjectileGroup:
+    """The projectiles of one type in flight, held in numpy arrays so
+    they move, collide and draw together. The first count entries are in
+    flight; the ones that land are packed out after each update, and
+    their slots are reused by the next ones fired."""
+    START_CAPACITY = 256  # slots to start with (doubled when they run out)
+    FIELDS = ("x", "y", "velocity_x", "velocity_y", "angle", "time_left")
+
+    kind = None  # ProjectileType
+    count = 0  # projectiles in flight
+    x = None  # position in tiles
+    y = None
+    velocity_x = None  # tiles/sec
+    velocity_y = None
+    angle = None  # degrees, with the same convention as sprite_angle
+    time_left = None  # seconds before dropping
+
+    def __init__(self, kind):
+        self.kind = kind
+        for field in self.FIELDS:
+            setattr(self, field, numpy.zeros(self.START_CAPACITY))
+
+    def fire(self, x, y, angle):
+        """Launches a projectile from x, y towards angle (in degrees)"""
+        if self.count == len(self.x):
+            for field in self.FIELDS:
+                old = getattr(self, field)
+                new = numpy.zeros(len(old) * 2)
+                new[:self.count] = old[:self.count]
+                setattr(self, field, new)
+
+        slot = self.count
+        self.count += 1
+        self.x[slot] = x
+        self.y[slot] = y
+        self.velocity_x[slot] = -math.sin(math.radians(angle)) * self.kind.speed
+        self.velocity_y[slot] = -math.cos(math.radians(angle)) * self.kind.speed
+        self.angle[slot] = angle
+        self.time_left[slot] = self.kind.lifetime
+
+    def update(self, delta_time, blocked, enemies):
+        """Moves the projectiles, drops the ones out of time or stopped by
+           the ground, and queues hits on enemies with combat. blocked and
+           enemies come from Projectiles.update."""
+        count = self.count
+        if count == 0:
+            return
+        last_x = self.x[:count].copy()
+        last_y = self.y[:count].copy()
+        self.x[:count] += self.velocity_x[:count] * delta_time
+        self.y[:count] += self.velocity_y[:count] * delta_time
+        self.angle[:count] += self.kind.spin * delta_time
+        self.time_left[:count] -= delta_time
+
+        landed = self.time_left[:count] <= 0
+        landed |= self.hits_ground(last_x, last_y, delta_time, blocked)
+        if enemies is not None:
+            landed |= self.hits_enemies(last_x, last_y, delta_time, enemies, landed)
+
+        # Pack the ones still flying to the front
+        flying = ~landed
+        self.count = int(numpy.count_nonzero(flying))
+        if self.count < count:
+            for field in self.FIELDS:
+                array = getattr(self, field)
+                array[:self.count] = array[:count][flying]
+
+    def hits_ground(self, last_x, last_y, delta_time, blocked):
+        """Returns which projectiles crossed a blocked tile or left the
+           map. The path is checked every half tile, so fast ones can't
+           skip over a tile."""
+        count = self.count
+        hit = numpy.zeros(count, numpy.bool_)
+        samples = max(1, int(math.ceil(self.kind.speed * delta_time / 0.5)))
+        for sample in xrange(1, samples + 1):
+            along = float(sample) / samples
+            tile_x = numpy.floor(last_x + (self.x[:count] - last_x) * along).astype(numpy.intp)
+            tile_y = numpy.floor(last_y + (self.y[:count] - last_y) * along).astype(numpy.intp)
+            outside = (tile_x < 0) | (tile_x >= MAP.SIZE_X) | (tile_y < 0) | (tile_y >= MAP.SIZE_Y)
+            hit |= outside
+            inside = ~outside
+            hit[inside] |= blocked[tile_x[inside], tile_y[inside]]
+        return hit
+
+    def hits_enemies(self, last_x, last_y, delta_time, enemies, landed):
+        """Queues a hit for each projectile whose path this tick touched an
+           enemy (the first one it touched, if several), returning which
+           projectiles hit something"""
+        count = self.count
+        hit = numpy.zeros(count, numpy.bool_)
+        targets, enemy_x, enemy_y, enemy_radius = enemies
+
+        # Bucket the projectiles by cell: sorted by cell key, each cell's
+        # projectiles are a run that searchsorted can find
+        cell_size = Projectiles.CELL_SIZE
+        keys = (numpy.floor(self.x[:count] / cell_size).astype(numpy.int64) * Projectiles.KEY_STRIDE +
+                numpy.floor(self.y[:count] / cell_size).astype(numpy.int64))
+        order = numpy.argsort(keys)
+        sorted_keys = keys[order]
+
+        # Look up the cells around each enemy that a projectile touching it
+        # this tick could have ended up in
+        reach = enemy_radius.max() + self.kind.radius + self.kind.speed * delta_time
+        span = int(2 * reach / cell_size) + 2
+        steps = numpy.arange(span)
+        first_x = numpy.floor((enemy_x - reach) / cell_size).astype(numpy.int64)
+        first_y = numpy.floor((enemy_y - reach) / cell_size).astype(numpy.int64)
+        query = ((first_x[:, numpy.newaxis, numpy.newaxis] + steps[numpy.newaxis, :, numpy.newaxis]) *
+                 Projectiles.KEY_STRIDE +
+                 first_y[:, numpy.newaxis, numpy.newaxis] + steps[numpy.newaxis, numpy.newaxis, :]).ravel()
+        starts = sorted_keys.searchsorted(query, "left")
+        lengths = sorted_keys.searchsorted(query, "right") - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return hit
+
+        # Every (enemy, projectile) pair sharing a cell
+        pair_enemy = numpy.repeat(numpy.arange(len(targets)).repeat(span * span), lengths)
+        run_starts = numpy.cumsum(lengths) - lengths
+        pair_projectile = order[numpy.repeat(starts - run_starts, lengths) + numpy.arange(total)]
+
+        # Nearest point of each projectile's path to the enemy
+        start_x = last_x[pair_projectile]
+        start_y = last_y[pair_projectile]
+        move_x = self.x[pair_projectile] - start_x
+        move_y = self.y[pair_projectile] - start_y
+        length_squared = move_x * move_x + move_y * move_y
+        along = ((enemy_x[pair_enemy] - start_x) * move_x + (enemy_y[pair_enemy] - start_y) * move_y) / \
+            numpy.maximum(length_squared, 1e-12)
+        along = numpy.clip(along, 0.0, 1.0)
+        gap_x = enemy_x[pair_enemy] - (start_x + move_x * along)
+        gap_y = enemy_y[pair_enemy] - (start_y + move_y * along)
+        touch = enemy_radius[pair_enemy] + self.kind.radius
+        touching = (gap_x * gap_x + gap_y * gap_y <= touch * touch) & ~landed[pair_projectile]
+        if not touching.any():
+            return hit
+
+        # One hit per projectile, on the enemy it met first along its path
+        pair_projectile = pair_projectile[touching]
+        pair_enemy = pair_enemy[touching]
+        first = numpy.lexsort((along[touching], pair_projectile))
+        pair_projectile = pair_projectile[first]
+        pair_enemy = pair_enemy[first]
+        projectile_numbers, firsts = numpy.unique(pair_projectile, return_index=True)
+        for projectile, enemy in zip(projectile_numbers.tolist(), pair_enemy[firsts].tolist()):
+            push = Vector(self.velocity_x[projectile], self.velocity_y[projectile])
+            combat.hit(targets[enemy], self.kind.damage, push.normalise(self.kind.knockback))
+        hit[projectile_numbers] = True
+        return hit
+
+    def render(self, screen, camera):
+        """Draws the projectiles on screen"""
+        count = self.count
+        if count == 0:
+            return
+        frames, offsets = self.kind.rotations()
+        margin = max(self.kind.sprite_size)
+        screen_x = (self.x[:count] - camera.x) * MAP.TILE_SIZE
+        screen_y = (self.y[:count] - camera.y) * MAP.TILE_SIZE
+        shown = ((screen_x > -margin) & (screen_x < screen.get_width() + margin) &
+                 (screen_y > -margin) & (screen_y < screen.get_height() + margin))
+        if not shown.any():
+            return
+
+        frame = numpy.round(self.angle[:count][shown] * self.kind.ROTATIONS / 360.0).astype(numpy.intp)
+        frame %= self.kind.ROTATIONS
+        left = screen_x[shown].astype(numpy.intp) + offsets[frame, 0]
+        top = screen_y[shown].astype(numpy.intp) + offsets[frame, 1]
+        screen.blits([(frames[number], (x, y)) for number, x, y in
+                      zip(frame.tolist(), left.tolist(), top.tolist())], False)
+
+
+class Projectiles:
+    """Every projectile in flight, grouped by type.
+
+    Projectiles aren't Objects: each type's are kept in a ProjectileGroup
+    and moved, collided and drawn as whole numpy arrays, so thousands can
+    fly at once. Each update checks their paths against a grid of the
+    tiles they can't cross, and against the enemies through a cell index
+    of the projectiles; hits go to combat to be applied with the rest of
+    the tick's attacks."""
+    CELL_SIZE = 2.0  # size of the projectile index's cells in tiles
+    KEY_STRIDE = 1 << 32  # cell key = cell x * KEY_STRIDE + cell y
+
+    groups = None  # ProjectileType: ProjectileGroup
+    map = None  # MapClass flown over
+    blocked = None  # numpy bool array, indexed [x][y], of tiles projectiles stop at
+
+    def __init__(self):
+        self.groups = dict()
+
+    def set_map(self, map):
+        """Starts stopping projectiles at the blocked tiles of map"""
+        self.map = map
+        self.blocked = numpy.in1d(map.map, MAP.BLOCKED_TILES).reshape(numpy.shape(map.map))
+        map.listeners.append(self.tile_changed)  # follow set_tile() changes
+
+    def tile_changed(self, x, y):
+        """Map listener: updates whether a changed tile is blocked"""
+        self.blocked[x, y] = self.map.map[x][y] in MAP.BLOCKED_TILES
+
+    def fire(self, kind, x, y, angle):
+        """Launches a projectile of type kind from x, y towards angle (in
+           degrees, with the same convention as sprite_angle)"""
+        group = self.groups.get(kind)
+        if group is None:
+            group = self.groups[kind] = ProjectileGroup(kind)
+        group.fire(x, y, angle)
+
+    def count(self):
+        """Returns how many projectiles are in flight"""
+        return sum(group.count for group in self.groups.itervalues())
+
+    def clear(self):
+        """Drops every projectile in flight"""
+        for group in self.groups.itervalues():
+            group.count = 0
+
+    def update(self, delta_time, enemies):
+        """Moves every projectile and queues their hits on enemies"""
+        if not any(group.count for group in self.groups.itervalues()):
+            return
+
+        # Enemy circles, shared by every group
+        targets = [enemy for enemy in enemies if not enemy.despawning]
+        circles = None
+        if targets:
+            circles = numpy.array([Combat.target_circle(enemy) for enemy in targets])
+            circles = (targets, circles[:, 0], circles[:, 1], circles[:, 2])
+
+        for group in self.groups.itervalues():
+            group.update(delta_time, self.blocked, circles)
+
+    def render(self, screen, camera):
+        for group in self.groups.itervalues():
+            group.render(screen, camera)
+
+
+# Projectiles of the whole game
+projectiles = Projectiles()
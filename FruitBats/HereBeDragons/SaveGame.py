@@ -0,0 +1,160 @@
+import os
+import zlib
+import struct
+import pickle
+import traceback
+import threading
+import Queue
+
+import numpy
+
+from Player import Player
+from TestObject import PikachuStatue
+from Attack import Swipe
+from Enemy import ChaserEnemy
+
+# Object classes that can appear in a save, by class name
+OBJECT_TYPES = dict((cls.__name__, cls) for cls in
+                    (Player, PikachuStatue, Swipe, ChaserEnemy))
+
+
+class SaveGame:
+    """Versioned save file format for the full game state.
+
+    File layout: magic "HBDS" and format version (uint16), followed by a
+    zlib-compressed pickle of plain data only:
+        seed, map size, raw tile and sea array bytes, a list of
+        (class name, save_state()) for every saved object (the player
+        first), the inventory contents, whether it is day and the raw
+        bytes of the fog's explored bitmap.
+
+    Version 1 saves (without explored) still load, with nothing explored.
+
+    Objects choose what they save through their save_fields (see
+    Object.save_state), so class changes don't break old saves the way
+    pickling the objects themselves would.
+    """
+    MAGIC = "HBDS"
+    FORMAT_VERSION = 2
+    READABLE_VERSIONS = (1, 2)  # versions read() can still load
+    HEADER = struct.Struct("<4sH")
+    DEFAULT_FILE = "savegame.sav"
+
+    @staticmethod
+    def snapshot(game):
+        """Captures the game state on the main thread. This is cheap: the
+           map arrays are shared copy-on-write (see MapClass.snapshot) and
+           objects only contribute a tuple of values."""
+        tiles, sea = game.map.snapshot()
+        objects = []
+        for obj in game.objects:
+            if obj.save_fields is not None:
+                objects.append((obj.__class__.__name__, obj.save_state()))
+        return {"seed": game.seed,
+                "tiles": tiles,
+                "sea": sea,
+                "objects": objects,
+                "inventory": list(game.invent.current_inventory),
+                "day": game.fog.day,
+                "explored": game.fog.explored.copy()}
+
+    @staticmethod
+    def write(path, snapshot):
+        """Writes a snapshot to path (safe to call from any thread)"""
+        data = dict(snapshot)
+        data["shape"] = snapshot["tiles"].shape
+        data["tiles"] = numpy.ascontiguousarray(snapshot["tiles"]).tostring()
+        data["sea"] = numpy.ascontiguousarray(snapshot["sea"]).tostring()
+        data["explored_shape"] = snapshot["explored"].shape
+        data["explored"] = snapshot["explored"].tostring()
+        payload = zlib.compress(pickle.dumps(data, 2))
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(SaveGame.HEADER.pack(SaveGame.MAGIC,
+                                         SaveGame.FORMAT_VERSION))
+            f.write(payload)
+        # Write then rename so a crash never leaves a half-written save
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+    @staticmethod
+    def read(path):
+        """Reads a save file back into a snapshot dict. Raises ValueError
+           if the file isn't a save or is from an unknown version."""
+        with open(path, "rb") as f:
+            header = f.read(SaveGame.HEADER.size)
+            payload = f.read()
+        if len(header) != SaveGame.HEADER.size:
+            raise ValueError("Not a save file: " + path)
+        magic, version = SaveGame.HEADER.unpack(header)
+        if magic != SaveGame.MAGIC:
+            raise ValueError("Not a save file: " + path)
+        if version not in SaveGame.READABLE_VERSIONS:
+            raise ValueError("Unsupported save version %d" % version)
+
+        data = pickle.loads(zlib.decompress(payload))
+        data["tiles"] = numpy.fromstring(
+            data["tiles"], dtype=numpy.int8).reshape(data["shape"])
+        data["sea"] = numpy.fromstring(
+            data["sea"], dtype=numpy.bool_).reshape(data["shape"])
+        if "explored" in data:
+            data["explored"] = numpy.fromstring(
+                data["explored"], dtype=numpy.uint8).reshape(
+                data["explored_shape"])
+        else:
+            data["explored"] = None  # nothing explored yet
+        return data
+
+    @staticmethod
+    def create_objects(snapshot):
+        """Returns new objects for the saved object states, in order"""
+        objects = []
+        for class_name, state in snapshot["objects"]:
+            obj = OBJECT_TYPES[class_name](state[0], state[1])
+            obj.load_state(state)
+            objects.append(obj)
+        return objects
+
+
+class SaveWriter:
+    """Writes saves on a background thread so saving never stalls a
+    frame. If saves queue up faster than they are written, only the
+    newest one is kept."""
+    thread = None
+    pending = None  # queue of (path, snapshot) waiting to be written
+    error = None  # exception from the last save that failed, if any
+
+    def __init__(self):
+        self.pending = Queue.Queue(1)
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def save(self, path, snapshot):
+        """Queues a snapshot to be written to path"""
+        try:
+            self.pending.get_nowait()  # drop an older unwritten save
+            self.pending.task_done()
+        except Queue.Empty:
+            pass
+        self.pending.put((path, snapshot))
+
+    def run(self):
+        """Background thread: writes queued saves"""
+        while True:
+            path, snapshot = self.pending.get()
+            try:
+                SaveGame.write(path, snapshot)
+            except Exception as error:
+                # Report it and keep going, so later saves still happen
+                self.error = error
+                print("Couldn't save to %s:" % path)
+                traceback.print_exc()
+            finally:
+                self.pending.task_done()
+
+    def wait(self):
+        """Blocks until every queued save has been written"""
+        self.pending.join()
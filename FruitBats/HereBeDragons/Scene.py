@@ -0,0 +1,243 @@
+import threading
+
+import pygame
+
+
+class Scene:
+    """One screen of the game (menu, gameplay, pause...), run by a
+    SceneManager. Overload the hooks that matter to the scene."""
+    manager = None  # SceneManager running the scene, set when pushed
+    frame_rate = 60  # most frames per second while on top (0 = no limit)
+    transparent = False  # scenes below stay visible and keep rendering
+    pauses_below = True  # scenes below stop updating while this is on top
+    preloaded = False  # whether preload has run
+
+    def preload(self):
+        """Loads the scene's assets. May run on a background thread (see
+           SceneManager.preload), so only load files here; don't touch
+           the display."""
+        pass
+
+    def enter(self):
+        """Called when the scene is pushed"""
+        pass
+
+    def exit(self):
+        """Called when the scene is popped"""
+        pass
+
+    def cover(self):
+        """Called when another scene is pushed on top of this one"""
+        pass
+
+    def uncover(self):
+        """Called when the scene above this one is popped"""
+        pass
+
+    def wants_frames(self):
+        """Returns False if nothing will change until there's input, so
+           the manager can sleep until the next event"""
+        return True
+
+    def update(self, delta_time, events):
+        """Runs one frame of the scene. events are the PyGame events taken
+           off the queue this frame."""
+        pass
+
+    def render(self, screen):
+        """Draws the scene (the manager flips the display afterwards)"""
+        pass
+
+
+class SceneManager:
+    """A stack of scenes sharing one event loop and one clock.
+
+    Each frame the top scene is updated, along with the scenes below it
+    for as long as the scene above doesn't pause them. Rendering starts
+    from the highest opaque scene, so scenes hidden under it aren't drawn
+    at all. When the top scene doesn't want frames the manager sleeps
+    until the next event instead of spinning.
+    """
+    screen = None
+    scenes = None  # scene stack, top last
+    clock = None  # the one clock timing every scene
+    delta_time = 0.0  # seconds since the last frame
+    preloads = None  # scene: thread preloading it
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.scenes = []
+        self.clock = pygame.time.Clock()
+        self.preloads = dict()
+
+    def top(self):
+        """Returns the scene on top of the stack, or None"""
+        if self.scenes:
+            return self.scenes[-1]
+        return None
+
+    def preload(self, scene):
+        """Starts loading a scene's assets in the background, e.g. the next
+           scene while the current one is showing"""
+        if scene.preloaded or scene in self.preloads:
+            return
+        thread = threading.Thread(target=self.run_preload, args=(scene,))
+        thread.daemon = True
+        self.preloads[scene] = thread
+        thread.start()
+
+    @staticmethod
+    def run_preload(scene):
+        scene.preload()
+        scene.preloaded = True
+
+    def finish_preload(self, scene):
+        """Makes sure a scene's assets are loaded, waiting for a background
+           preload if one was started"""
+        thread = self.preloads.pop(scene, None)
+        if thread is not None:
+            thread.join()
+        if not scene.preloaded:
+            self.run_preload(scene)
+
+    def push(self, scene):
+        """Puts a scene on top of the stack"""
+        self.finish_preload(scene)
+        if self.scenes:
+            self.scenes[-1].cover()
+        scene.manager = self
+        self.scenes.append(scene)
+        scene.enter()
+
+    def pop(self):
+        """Removes the top scene"""
+        scene = self.scenes.pop()
+        scene.exit()
+        scene.manager = None
+        if self.scenes:
+            self.scenes[-1].uncover()
+        return scene
+
+    def replace(self, scene):
+        """Swaps the top scene for another"""
+        self.pop()
+        self.push(scene)
+
+    def quit(self):
+        """Pops every scene, ending run"""
+        while self.scenes:
+            self.pop()
+
+    def updating_scenes(self):
+        """Returns the scenes to update this frame, bottom first"""
+        index = len(self.scenes) - 1
+        while index > 0 and not self.scenes[index].pauses_below:
+            index -= 1
+        return self.scenes[index:]
+
+    def visible_scenes(self):
+        """Returns the scenes to render this frame, bottom first"""
+        index = len(self.scenes) - 1
+        while index > 0 and self.scenes[index].transparent:
+            index -= 1
+        return self.scenes[index:]
+
+    def run(self):
+        """Runs frames until the stack is empty"""
+        while self.scenes:
+            top = self.scenes[-1]
+            if top.wants_frames():
+                events = pygame.event.get()
+            else:
+                # Nothing to do until there's input, so sleep till then
+                events = [pygame.event.wait()] + pygame.event.get()
+            self.delta_time = self.clock.tick(top.frame_rate) / 1000.0
+
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit()
+                    return
+
+            for scene in self.updating_scenes():
+                if scene.manager is self:  # not popped earlier this frame
+                    scene.update(self.delta_time, events)
+
+            if self.scenes:
+                for scene in self.visible_scenes():
+                    scene.render(self.screen)
+                pygame.display.flip()
+
+
+class PauseScene(Scene):
+    """Freezes the game under a dimmed still of the last frame until P or
+    Escape is pressed"""
+    DIM_COLOUR = (0, 0, 0, 150)
+    TEXT_COLOUR = (255, 255, 255)
+
+    still = None  # the paused frame, dimmed, with the message on it
+    drawn = False  # whether still has been shown since the last input
+
+    def enter(self):
+        # Draw once from a copy of the screen, so the game underneath
+        # needn't render while paused
+        screen = self.manager.screen
+        self.still = screen.copy()
+        dim = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        dim.fill(self.DIM_COLOUR)
+        self.still.blit(dim, (0, 0))
+        label = pygame.font.Font(None, 60).render("Paused", 1, self.TEXT_COLOUR)
+        self.still.blit(label, ((screen.get_width() - label.get_width()) / 2,
+                                (screen.get_height() - label.get_height()) / 2))
+        self.drawn = False
+
+    def wants_frames(self):
+        return not self.drawn
+
+    def update(self, delta_time, events):
+        self.drawn = False
+        for event in events:
+            if event.type == pygame.KEYDOWN and \
+                    event.key in (pygame.K_p, pygame.K_ESCAPE):
+                self.manager.pop()
+                return
+
+    def render(self, screen):
+        screen.blit(self.still, (0, 0))
+        self.drawn = True
+
+
+class CreationScene(Scene):
+    """Character creation. The component images are loaded by preload,
+    so they can load in the background while the menu is showing."""
+    ASSETS = "SpriteGeneration/Assets"
+    INDEX_FILE = "char_creation_index.txt"
+
+    next_scene = None  # scene to go to once the character is made
+    images = None  # GetImages with the component choices
+    window = None  # CharacterCreation screen
+
+    def __init__(self, next_scene):
+        self.next_scene = next_scene
+
+    def preload(self):
+        # Imported here so the sprite generator is only loaded if needed
+        from SpriteGeneration import CharacterCreation, GetImages
+        self.images = GetImages(self.ASSETS, ".png", (128, 128))
+        CharacterCreation.load_blank_images()
+
+    def enter(self):
+        from SpriteGeneration import CharacterCreation
+        self.window = CharacterCreation(self.manager.screen, self.images.hair,
+                                        self.images.body, self.images.legs)
+        self.window.start()
+
+    def wants_frames(self):
+        return False  # the window redraws itself when changed
+
+    def update(self, delta_time, events):
+        for event in events:
+            self.window.handle_event(event)
+            if not self.window.running:
+                self.window.save_component_index(self.INDEX_FILE)
+                self.manager.replace(self.next_scene)
+                return
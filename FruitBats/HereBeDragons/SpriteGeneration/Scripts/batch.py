@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import itertools
+import multiprocessing
+
+import pygame
+
+from get_images import GetImages
+from compositor import Compositor
+from sprite_ids import SpriteIds
+
+# Compositor of the current worker process (see init_worker)
+worker_compositor = None
+
+
+def init_worker(path_to_assets, sprite_file_type):
+
+    """Pool initialiser: loads the component images once per worker process."""
+
+    global worker_compositor
+    images = GetImages(path_to_assets, sprite_file_type)
+    worker_compositor = Compositor(images, memory_limit=0)
+
+
+def bake_sprites((combinations, size)):
+
+    """
+    Pool task: bakes a list of component combinations.
+
+    Returns:
+        sprites (list of strings): The RGBA pixels of each sprite, in order.
+    """
+
+    sprites = []
+    for indices in combinations:
+        sprites.append(pygame.image.tostring(worker_compositor.get(indices, size), "RGBA"))
+    worker_compositor.clear()
+
+    return sprites
+
+
+def list_combinations(images, count, mode, seed):
+
+    """
+    Chooses the component combinations to generate.
+
+    Args:
+        images (GetImages): The component images.
+        count (int): How many sprites to make. In "all" mode, None makes every combination.
+        mode (string): "random" picks components at random; "all" goes through every combination in order.
+        seed (int): Seed for the random choices.
+
+    Returns:
+        combinations (list of tuples): Component indices for Compositor.get.
+    """
+
+    compositor = Compositor(images)
+    if mode == "random":
+        rng = random.Random(seed)
+        return [compositor.random_indices(rng) for i in xrange(count)]
+
+    choices = []
+    for component in Compositor.COMPONENTS:
+        length = len(getattr(images, component))
+        choices.append(range(length) if length else [None])
+
+    return list(itertools.islice(itertools.product(*choices), count))
+
+
+def generate(args):
+
+    """Generates the sprites described by the command line arguments and writes the sheet and its index."""
+
+    pygame.init()
+
+    images = GetImages(args.assets, args.file_type)
+    combinations = list_combinations(images, args.count, args.mode, args.seed)
+    if not combinations:
+        print("No sprites to generate")
+        return
+
+    # Bake in parallel, a chunk of sprites per task
+    size = (args.size, args.size)
+    chunks = [(combinations[start:start + args.chunk], size)
+              for start in xrange(0, len(combinations), args.chunk)]
+    pool = multiprocessing.Pool(args.workers, init_worker, (args.assets, args.file_type))
+    try:
+        baked = list(itertools.chain.from_iterable(pool.imap(bake_sprites, chunks)))
+    finally:
+        pool.close()
+        pool.join()
+
+    # Pack the sprites into a grid on one sheet
+    columns = int(math.ceil(math.sqrt(len(baked))))
+    rows = int(math.ceil(len(baked) / float(columns)))
+    sheet = pygame.Surface((columns * size[0], rows * size[1]), pygame.SRCALPHA, 32)
+
+    sprite_ids = SpriteIds(args.names_file, args.counter_file).allocate(len(baked))
+    index = {"sheet": args.name + ".png",
+             "frame_size": list(size),
+             "columns": columns,
+             "components": list(Compositor.COMPONENTS),
+             "sprites": []}
+
+    for number, (pixels, indices, sprite_id) in enumerate(zip(baked, combinations, sprite_ids)):
+        x = (number % columns) * size[0]
+        y = (number // columns) * size[1]
+        sheet.blit(pygame.image.fromstring(pixels, size, "RGBA"), (x, y))
+        index["sprites"].append({"id": sprite_id,
+                                 "name": SpriteIds.name(sprite_id),
+                                 "x": x,
+                                 "y": y,
+                                 "components": list(indices)})
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    pygame.image.save(sheet, os.path.join(args.output, args.name + ".png"))
+    with open(os.path.join(args.output, args.name + ".json"), "w") as f:
+        json.dump(index, f, indent=1)
+
+    print("Generated " + str(len(baked)) + " sprites into " + os.path.join(args.output, args.name + ".png"))
+
+
+def main(argv=None):
+
+    """Command line entry point. Run with --help for the options."""
+
+    parser = argparse.ArgumentParser(description="Generate many sprites into a packed sprite sheet with a JSON index.")
+    parser.add_argument("count", type=int, nargs="?", default=None,
+                        help="number of sprites (required in random mode; all combinations if left out in all mode)")
+    parser.add_argument("--mode", choices=("random", "all"), default="random",
+                        help="pick components at random, or go through every combination")
+    parser.add_argument("--seed", type=int, default=None, help="seed for random mode")
+    parser.add_argument("--size", type=int, default=16, help="width and height of each sprite in pixels")
+    parser.add_argument("--assets", default="../Assets", help="path to the assets folder")
+    parser.add_argument("--file-type", default=".png", help="file extension of the component images")
+    parser.add_argument("--output", default="../Assets/Sprites/CustomSprites", help="folder to write the sheet to")
+    parser.add_argument("--name", default="sprite_sheet", help="file name of the sheet and index, without extension")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk", type=int, default=64, help="sprites baked per task")
+    parser.add_argument("--names-file", default="sprite_names.txt", help="file recording the sprite names used")
+    parser.add_argument("--counter-file", default="sprite_id_counter.txt", help="file holding the next free sprite ID")
+    args = parser.parse_args(argv)
+
+    if args.mode == "random" and args.count is None:
+        parser.error("count is required in random mode")
+
+    generate(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -17,8 +17,8 @@ class CharacterCreation:
 
     Attributes:
         path_to_assets (string): The file path to the assets folder. This should later be added to the constructor so it can be passed in when the class is instantiated.
-        blank_component (image): A blank image that is used as a placeholder
-        blank_base (image): The image used for the base of the sprite
+        blank_component (image): A blank image that is used as a placeholder. Loaded on first use (see load_blank_images).
+        blank_base (image): The image used for the base of the sprite. Loaded on first use (see load_blank_images).
 
         main_screen (pygame.Display): The character creation window
         background_colour (pygame.Colour): The colour for the main window.
@@ -46,8 +46,8 @@ class CharacterCreation:
 
     # path_to_assets = "../Assets"
     path_to_assets = "SpriteGeneration/Assets"
-    blank_component = pygame.image.load(path_to_assets + "/Sprites/blankComponent.png")
-    blank_base = pygame.image.load(path_to_assets + "/Sprites/base/base1.png")
+    blank_component = None
+    blank_base = None
 
     main_screen = None
     background_colour = (222, 184, 135)
@@ -109,6 +109,16 @@ class CharacterCreation:
 
         """Main method for the class. This creates the character creation window and checks for player input."""
 
+        self.start()
+
+        # Loop to keep window open and check for events. Waiting for events rather than polling keeps the CPU idle.
+        while self.running:
+            self.handle_event(pygame.event.wait())
+
+    def start(self):
+
+        """Draws the character creation window for the first time."""
+
         print("Drawing screen for first time")
 
         # Initialise display
@@ -120,20 +130,25 @@ class CharacterCreation:
         self.create_buttons()
         self.update_screen()
 
-        # Loop to keep window open and check for events
-        while self.running:
-            for event in pygame.event.get():
+    def handle_event(self, event):
 
-                # Each button checks if it was clicked
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    for button in self.buttons:
-                        button.check_click(pygame.mouse.get_pos())
+        """
+        Responds to one input event.
 
-                if event.type == pygame.QUIT:
-                    sys.exit()
+        Args:
+            event (pygame.event.Event): The event to handle.
+        """
+
+        # Each button checks if it was clicked
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for button in self.buttons:
+                button.check_click(event.pos)
 
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    sys.exit()
+        if event.type == pygame.QUIT:
+            sys.exit()
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            sys.exit()
 
     def update_screen(self):
 
@@ -152,12 +167,24 @@ class CharacterCreation:
             blank_sprite (Sprite): A Sprite with base image and blank components.
         """
 
+        self.load_blank_images()
+
         # Create and draw a new sprite with a base image and the last used components
         blank_sprite = Sprite((128, 128), self.background_colour, pygame.transform.scale(self.blank_base, (128, 128)), self.legs_choices[self.legs_index],
                                                                   self.body_choices[self.body_index], self.hair_choices[self.hair_index], self.blank_component, 0)
         blank_sprite.draw()
         return blank_sprite
 
+    @staticmethod
+    def load_blank_images():
+
+        """Loads the placeholder images the first time they are needed, so importing the module loads nothing."""
+
+        if CharacterCreation.blank_component is None:
+            path = CharacterCreation.path_to_assets + "/Sprites/"
+            CharacterCreation.blank_component = pygame.image.load(path + "blankComponent.png")
+            CharacterCreation.blank_base = pygame.image.load(path + "base/base1.png")
+
     def scroll_components(self, component, direction):
 
         """
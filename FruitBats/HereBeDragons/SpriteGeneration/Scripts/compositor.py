@@ -0,0 +1,213 @@
+import os
+import hashlib
+from collections import OrderedDict
+
+import pygame
+
+
+class Compositor:
+
+    """
+    Compositor class. Bakes sprite component combinations into single images and caches them, so many characters
+    with the same looks share one surface instead of each compositing their own.
+
+    Attributes:
+        COMPONENTS (tuple of strings): The components a sprite is built from, in drawing order. These match the
+                                       lists of a GetImages instance.
+        images (GetImages): The component images to composite from.
+        memory_limit (int): The most bytes of baked surfaces to keep in memory. The least recently used are dropped first.
+        cache_dir (string): Optional folder where baked images are saved and loaded from, so they survive restarts.
+                            Images are kept in a subfolder named by asset_signature, so they are only reused with
+                            the same component files and scaling.
+        baked (OrderedDict): Baked surfaces by (component indices, size), least recently used first.
+        memory_used (int): The bytes used by the surfaces in baked.
+    """
+
+    COMPONENTS = ("base", "legs", "body", "hair", "feet")
+
+    images = None
+    memory_limit = 0
+    cache_dir = None
+    baked = None
+    memory_used = 0
+
+    def __init__(self, images, memory_limit=32 * 1024 * 1024, cache_dir=None):
+
+        """
+        Constructor method.
+
+        Args:
+            images (GetImages): The component images to composite from.
+            memory_limit (int): The most bytes of baked surfaces to keep in memory.
+            cache_dir (string): Folder in which to persist baked images. None keeps them in memory only.
+        """
+
+        self.images = images
+        self.memory_limit = memory_limit
+        self.baked = OrderedDict()
+
+        if cache_dir is not None:
+            self.cache_dir = os.path.join(cache_dir, self.asset_signature())
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+    def get(self, indices, size=None):
+
+        """
+        Returns the baked image for a combination of components, baking it the first time it is asked for.
+        The returned surface is shared, so it must not be drawn on.
+
+        Args:
+            indices (tuple of ints): The index in each COMPONENTS list of the image to use, or None to leave
+                                     that component out.
+            size (tuple): The size to scale the image to, or None to keep the components' size.
+
+        Returns:
+            surface (pygame.Surface): The baked sprite image.
+        """
+
+        key = (tuple(indices), size)
+
+        surface = self.baked.pop(key, None)
+        if surface is None:
+            surface = self.load(key)
+            if surface is None:
+                surface = self.bake(key)
+                self.save(key, surface)
+            self.memory_used += self.surface_bytes(surface)
+
+        # (Re)insert as the most recently used
+        self.baked[key] = surface
+        self.trim()
+
+        return surface
+
+    def random_indices(self, rng):
+
+        """
+        Picks a random image for every component.
+
+        Args:
+            rng (random.Random): The random number generator to use.
+
+        Returns:
+            indices (tuple of ints): Component indices to pass to get.
+        """
+
+        indices = []
+        for component in self.COMPONENTS:
+            choices = getattr(self.images, component)
+            if choices:
+                indices.append(rng.randrange(len(choices)))
+            else:
+                indices.append(None)
+
+        return tuple(indices)
+
+    def bake(self, (indices, size)):
+
+        """Draws the components of a combination onto a new surface, then scales it once if needed."""
+
+        layers = [getattr(self.images, component)[index]
+                  for component, index in zip(self.COMPONENTS, indices) if index is not None]
+
+        width = max([layer.get_width() for layer in layers] or [1])
+        height = max([layer.get_height() for layer in layers] or [1])
+        surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+        for layer in layers:
+            surface.blit(layer, (0, 0))
+
+        if size is not None and size != (width, height):
+            surface = pygame.transform.scale(surface, size)
+
+        return self.prepare(surface)
+
+    def trim(self):
+
+        """Drops the least recently used baked images until within memory_limit, always keeping the newest."""
+
+        while self.memory_used > self.memory_limit and len(self.baked) > 1:
+            key, surface = self.baked.popitem(last=False)
+            self.memory_used -= self.surface_bytes(surface)
+
+    def clear(self):
+
+        """Drops every baked image from memory (images saved to cache_dir are kept)."""
+
+        self.baked.clear()
+        self.memory_used = 0
+
+    def asset_signature(self):
+
+        """
+        Returns a hash of the component files (their names, sizes and modification times, in index order) and the
+        scaling they were loaded with. Saved images are named by component indices, which are only meaningful for
+        the same files.
+
+        Returns:
+            signature (string): Hex digest to name the cache subfolder by.
+        """
+
+        digest = hashlib.sha1(repr(self.images.scaling))
+        for component in self.COMPONENTS:
+            for filename in self.images.files.get(component, []):
+                info = os.stat(filename)
+                digest.update("%s/%s:%d:%d\n" % (component, os.path.basename(filename),
+                                                  info.st_size, int(info.st_mtime)))
+
+        return digest.hexdigest()[:16]
+
+    def path(self, (indices, size)):
+
+        """Returns the file a combination is saved to in cache_dir."""
+
+        name = "-".join("x" if index is None else str(index) for index in indices)
+        if size is not None:
+            name += "_%dx%d" % size
+
+        return os.path.join(self.cache_dir, "sprite_" + name + ".png")
+
+    def load(self, key):
+
+        """Returns a combination's image saved in cache_dir, or None if there isn't one."""
+
+        if self.cache_dir is None:
+            return None
+
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        return self.prepare(pygame.image.load(path))
+
+    def save(self, key, surface):
+
+        """Saves a baked image to cache_dir, if set. Written then renamed so a half-written file is never loaded."""
+
+        if self.cache_dir is None:
+            return
+
+        path = self.path(key)
+        temp_path = path[:-len(".png")] + ".tmp.png"
+        pygame.image.save(surface, temp_path)
+
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+    @staticmethod
+    def prepare(surface):
+
+        """Converts a surface to the display's pixel format (if there is a display yet) so blitting it is fast."""
+
+        if pygame.display.get_surface() is not None:
+            return surface.convert_alpha()
+
+        return surface
+
+    @staticmethod
+    def surface_bytes(surface):
+
+        """Returns the memory used by a surface's pixels."""
+
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
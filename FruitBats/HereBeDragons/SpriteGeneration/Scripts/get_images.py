@@ -13,6 +13,7 @@ class GetImages:
         body (list of Surfaces) = list of images to be used for the sprite body
         hair (list of Surfaces) = list of images to be used for the sprite hair
         feet (list of Surfaces) = list of images to be used for the sprite feet
+        files (dict) = the file each image was loaded from, as lists by component name
     """
 
     base = []
@@ -20,6 +21,7 @@ class GetImages:
     body = []
     hair = []
     feet = []
+    files = None
 
     def __init__(self, path_to_assets, sprite_file_type, scaling=None):
 
@@ -35,6 +37,7 @@ class GetImages:
         self.path_to_assets = path_to_assets
         self.sprite_file_type = sprite_file_type
         self.scaling = scaling
+        self.files = {}
 
         self.load_all()
 
@@ -60,7 +63,9 @@ class GetImages:
             scaling (tuple): The amount to scale the sprite. Defaults to none.
         """
         
-        path = glob.glob(self.path_to_assets + "/Sprites/" + component + "/*" + self.sprite_file_type)
+        # Sorted so each image has the same index every run
+        path = sorted(glob.glob(self.path_to_assets + "/Sprites/" + component + "/*" + self.sprite_file_type))
+        self.files.setdefault(component, []).extend(path)
 
         if scaling != None:
             for filename in path:
@@ -1,6 +1,8 @@
 import pygame
 import pickle
 
+from sprite_ids import SpriteIds
+
 
 class Sprite:
 
@@ -115,24 +117,17 @@ class Sprite:
 
         """
         Saves the sprite image to file with a unique name and records the name used in a text document.
-        Whenever a sprite is saved the text document is checked to ensure that the same name is not used twice.
-        If the document does not exist, one will be created.
+        IDs come from SpriteIds, which keeps a counter so the same name is never used twice without rereading
+        the document. If the files do not exist, they will be created.
 
         Args:
               save_path (string): The file path in which to save the image.
               file_type (string): The file extension to use when saving the image.
         """
 
-        sprite_id = 0
-
-        with open("sprite_names.txt", "a+") as f:
-            for line in f:
-                sprite_id += 1
-
-            f.write("sprite" + str(sprite_id) + "\n")
-            f.close()
+        sprite_id = SpriteIds().allocate()[0]
 
-        pygame.image.save(self.image, save_path + "/sprite" + str(sprite_id) + "." + file_type)
+        pygame.image.save(self.image, save_path + "/" + SpriteIds.name(sprite_id) + "." + file_type)
 
     @staticmethod
     def serialize(file, to_pickle):
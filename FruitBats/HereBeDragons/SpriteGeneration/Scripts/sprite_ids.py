@@ -0,0 +1,119 @@
+import os
+import time
+
+
+class SpriteIds:
+
+    """
+    SpriteIds class. Hands out unique sprite IDs, safely even when several processes save sprites at once.
+
+    The next free ID is kept in a small counter file, so allocating never reads the names file. The names file is
+    only appended to, keeping its record of every name used. A lock file (created exclusively, so only one process
+    can hold it) makes each allocation atomic.
+
+    Attributes:
+        names_file (string): The file listing every sprite name handed out, one per line.
+        counter_file (string): The file holding the next free ID.
+        lock_file (string): The file that exists while an allocation is in progress.
+        LOCK_TIMEOUT (float): Seconds after which a lock is assumed to be left over from a crashed process.
+    """
+
+    LOCK_TIMEOUT = 10.0
+
+    names_file = None
+    counter_file = None
+    lock_file = None
+
+    def __init__(self, names_file="sprite_names.txt", counter_file="sprite_id_counter.txt"):
+
+        """
+        Constructor method.
+
+        Args:
+            names_file (string): The file listing every sprite name handed out.
+            counter_file (string): The file holding the next free ID.
+        """
+
+        self.names_file = names_file
+        self.counter_file = counter_file
+        self.lock_file = counter_file + ".lock"
+
+    def allocate(self, count=1):
+
+        """
+        Reserves count consecutive IDs and records their names.
+
+        Args:
+            count (int): The number of IDs to reserve.
+
+        Returns:
+            ids (list of ints): The reserved IDs.
+        """
+
+        self.lock()
+        try:
+            first_id = self.read_counter()
+
+            # Write then rename so the counter is never half-written
+            temp_file = self.counter_file + ".tmp"
+            with open(temp_file, "w") as f:
+                f.write(str(first_id + count) + "\n")
+            if os.path.exists(self.counter_file):
+                os.remove(self.counter_file)
+            os.rename(temp_file, self.counter_file)
+
+            ids = range(first_id, first_id + count)
+            with open(self.names_file, "a") as f:
+                for sprite_id in ids:
+                    f.write(self.name(sprite_id) + "\n")
+        finally:
+            self.unlock()
+
+        return ids
+
+    @staticmethod
+    def name(sprite_id):
+
+        """Returns the name a sprite ID is saved under."""
+
+        return "sprite" + str(sprite_id)
+
+    def read_counter(self):
+
+        """Returns the next free ID. The first time, the counter is started from the number of names already used."""
+
+        if os.path.exists(self.counter_file):
+            with open(self.counter_file) as f:
+                return int(f.read())
+
+        count = 0
+        if os.path.exists(self.names_file):
+            with open(self.names_file) as f:
+                for line in f:
+                    count += 1
+
+        return count
+
+    def lock(self):
+
+        """Waits until this process holds the lock file."""
+
+        while True:
+            try:
+                os.close(os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return
+            except OSError:
+                # Break locks left behind by a process that died mid-allocation
+                try:
+                    if time.time() - os.path.getmtime(self.lock_file) > self.LOCK_TIMEOUT:
+                        os.remove(self.lock_file)
+                        continue
+                except OSError:
+                    continue  # released while we looked
+                time.sleep(0.01)
+
+    def unlock(self):
+
+        """Releases the lock file."""
+
+        os.remove(self.lock_file)
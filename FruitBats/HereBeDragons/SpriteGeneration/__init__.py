@@ -1,4 +1,5 @@
 from Scripts import character_creation
 from Scripts.character_creation import CharacterCreation
 from Scripts.get_images import GetImages
-from Scripts.sprite import Sprite
\ No newline at end of file
+from Scripts.sprite import Sprite
+from Scripts.compositor import Compositor
\ No newline at end of file
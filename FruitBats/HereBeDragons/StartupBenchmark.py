@@ -0,0 +1,115 @@
+"""Measures how long the game takes to import, in the style of Python 3's
+-X importtime (which Python 2 doesn't have).
+
+    python StartupBenchmark.py [module] [--runs N] [--top N] [--log FILE]
+
+Every run imports the module (Game by default) in a fresh interpreter,
+timing each module the first time it's imported. The per-module table is
+from the median run; --log appends the median total to FILE so it can be
+tracked over time."""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import __builtin__
+
+
+def time_imports(module):
+    """Imports module, returning [(name, self seconds, cumulative seconds,
+       depth)] for every module it caused to be imported, in import
+       order"""
+    original_import = __builtin__.__import__
+    timings = []
+    stack = []  # [time spent in nested imports] for each import under way
+
+    def timed_import(name, *args, **kwargs):
+        if name in sys.modules:
+            return original_import(name, *args, **kwargs)
+        label = name or "." + ",".join(args[2] if len(args) > 2 else
+                                         kwargs.get("fromlist") or ())
+        entry = [label, 0.0, 0.0, len(stack)]
+        timings.append(entry)
+        stack.append(0.0)
+        start = time.time()
+        try:
+            return original_import(name, *args, **kwargs)
+        finally:
+            cumulative = time.time() - start
+            nested = stack.pop()
+            entry[1] = cumulative - nested
+            entry[2] = cumulative
+            if stack:
+                stack[-1] += cumulative
+
+    __builtin__.__import__ = timed_import
+    try:
+        __import__(module)
+    finally:
+        __builtin__.__import__ = original_import
+
+    return [tuple(entry) for entry in timings]
+
+
+def run_once(module):
+    """Times the imports in a fresh interpreter"""
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                      module, "--child"])
+    return json.loads(output.splitlines()[-1])  # after anything printed on import
+
+
+def print_timings(timings, top):
+    print("import time: self [us] | cumulative | imported package")
+    for name, self_time, cumulative, depth in timings:
+        print("import time: %9d | %10d | %s%s" % (
+            self_time * 1e6, cumulative * 1e6, "  " * depth, name))
+
+    if top:
+        print("")
+        print("Slowest %d modules by self time:" % top)
+        for name, self_time, cumulative, depth in \
+                sorted(timings, key=lambda timing: -timing[1])[:top]:
+            print("  %8.2fms  %s" % (self_time * 1000, name))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Time the game's imports")
+    parser.add_argument("module", nargs="?", default="Game",
+                        help="module to import (default: Game)")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="fresh interpreters to time (default: 5)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="slowest modules to list (default: 10)")
+    parser.add_argument("--log", metavar="FILE",
+                        help="append the median total to FILE")
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Imports are relative to the game's folder, wherever this is run from
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+
+    if args.child:
+        print(json.dumps(time_imports(args.module)))
+        return
+
+    runs = [run_once(args.module) for i in xrange(args.runs)]
+    totals = [sum(timing[2] for timing in run if timing[3] == 0)
+              for run in runs]
+    median = sorted(zip(totals, xrange(len(runs))))[len(runs) / 2]
+
+    print_timings(runs[median[1]], args.top)
+    print("")
+    print("Total: %.1fms (median of %d runs, min %.1fms, max %.1fms)" % (
+        median[0] * 1000, len(runs), min(totals) * 1000, max(totals) * 1000))
+
+    if args.log is not None:
+        with open(args.log, "a") as f:
+            f.write("%s,%s,%.2f\n" % (time.strftime("%Y-%m-%d %H:%M:%S"),
+                                      args.module, median[0] * 1000))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -3,16 +3,27 @@ import pygame
 from Objects import Object
 from Map import MAP
 from Collision import CollisionParams
+from Assets import assets
 
 
 class PikachuStatue(Object):
+    SPRITE_FILE = 'graphics/pikachu.png'
+
     def __init__(self, x, y):
-        self.sprite = pygame.image.load('graphics/pikachu.png')
-        self.sprite = pygame.transform.smoothscale(
-                        self.sprite, (MAP.TILE_SIZE, MAP.TILE_SIZE))
-        self.sprite = self.sprite.convert(24)
+        # Scaled once and shared by every statue
+        self.sprite = assets.get("pikachu statue", PikachuStatue.make_sprite)
         self.x = x
         self.y = y
         self.collision = CollisionParams((0.0, 0.0),
                                          (MAP.TILE_SIZE, MAP.TILE_SIZE),
                                          True)
+
+    @staticmethod
+    def make_sprite():
+        sprite = pygame.transform.smoothscale(
+                    assets.image(PikachuStatue.SPRITE_FILE),
+                    (MAP.TILE_SIZE, MAP.TILE_SIZE))
+        return sprite.convert(24)
+
+    def is_idle(self, player):
+        return True  # statues never do anything
@@ -0,0 +1,97 @@
+import os
+import struct
+
+import numpy
+
+from Map import MAP
+from MapGenerator import GENERATORS, create_generator
+
+
+class WorldCache:
+    """Stores generated maps on disk, keyed by seed, generator (see
+    MAP.GENERATOR) and generator version.
+
+    File layout (little-endian):
+        header: magic "HBDW", format version (uint16),
+                generator version (uint16), seed (int64),
+                size x (uint16), size y (uint16)
+        tiles:  size x * size y int8 values, indexed [x][y]
+        sea:    size x * size y bool values, indexed [x][y]
+
+    Cached grids are memory-mapped copy-on-write, so loading is almost
+    free and changing a tile in game never writes back to the file.
+    """
+    MAGIC = "HBDW"
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct("<4sHHqHH")
+    DIRECTORY = "WorldCache"
+
+    directory = None
+
+    def __init__(self, directory=DIRECTORY):
+        self.directory = directory
+
+    def path(self, seed):
+        """Returns the file a seed's map is cached in"""
+        return os.path.join(self.directory, "world_%d_%s_v%d.bin"
+                            % (seed, MAP.GENERATOR, self.version()))
+
+    def version(self):
+        """Returns the version of the generator picked by MAP.GENERATOR"""
+        return GENERATORS[MAP.GENERATOR].VERSION
+
+    def load(self, seed):
+        """Returns memory-mapped (tiles, sea) arrays for seed, or None if
+           the map isn't cached or was made by a different generator"""
+        path = self.path(seed)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            header = f.read(self.HEADER.size)
+        if len(header) != self.HEADER.size:
+            return None
+        magic, format_version, generator_version, file_seed, size_x, size_y \
+            = self.HEADER.unpack(header)
+        if (magic != self.MAGIC or format_version != self.FORMAT_VERSION or
+                generator_version != self.version() or
+                file_seed != seed or
+                (size_x, size_y) != (MAP.SIZE_X, MAP.SIZE_Y)):
+            return None
+
+        shape = (size_x, size_y)
+        tiles = numpy.memmap(path, dtype=numpy.int8, mode="c",
+                             offset=self.HEADER.size, shape=shape)
+        sea = numpy.memmap(path, dtype=numpy.bool_, mode="c",
+                           offset=self.HEADER.size + size_x * size_y,
+                           shape=shape)
+        return tiles, sea
+
+    def save(self, seed, tiles, sea):
+        """Writes a map to the cache, replacing any older copy"""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self.path(seed)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION,
+                                     self.version(), seed,
+                                     MAP.SIZE_X, MAP.SIZE_Y))
+            f.write(numpy.ascontiguousarray(tiles, dtype=numpy.int8).tostring())
+            f.write(numpy.ascontiguousarray(sea, dtype=numpy.bool_).tostring())
+        # Write then rename so a half-written file is never loaded
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+
+    def load_or_generate(self, seed, progress=None):
+        """Returns (tiles, sea) for seed, generating and caching the map
+           if it isn't cached yet. Seed 0 gives a new random map which
+           isn't cached."""
+        if seed != 0:
+            cached = self.load(seed)
+            if cached is not None:
+                return cached
+        tiles, sea = create_generator(seed, progress).generate()
+        if seed != 0:
+            self.save(seed, tiles, sea)
+        return tiles, sea